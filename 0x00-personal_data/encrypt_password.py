@@ -2,20 +2,35 @@
 """
 Module for hashing and validating passwords.
 """
+import math
+import os
+import statistics
+import time
+from concurrent.futures import (Executor, ProcessPoolExecutor,
+                                ThreadPoolExecutor)
+from functools import partial
+from typing import Iterable, List, Tuple
+
 import bcrypt
 
 
-def hash_password(password: str) -> bytes:
+DEFAULT_ROUNDS = 12
+MIN_ROUNDS = 4
+MAX_ROUNDS = 31
+
+
+def hash_password(password: str, rounds: int = DEFAULT_ROUNDS) -> bytes:
     """
     Generate a salted, hashed password.
 
     Args:
         password (str): The plain text password to hash.
+        rounds (int): The bcrypt cost factor (log2 of the iterations).
 
     Returns:
         bytes: The salted, hashed password as a byte string.
     """
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds)
     hashed_password = bcrypt.hashpw(password.encode(), salt)
 
     return hashed_password
@@ -33,3 +48,132 @@ def is_valid(hashed_password: bytes, password: str) -> bool:
         bool: True if the password matches the hashed password,False otherwise.
     """
     return bcrypt.checkpw(password.encode(), hashed_password)
+
+
+def get_rounds(hashed_password: bytes) -> int:
+    """
+    Read the cost factor a hash was created with.
+
+    Args:
+        hashed_password (bytes): A ``$2b$<rounds>$...`` bcrypt hash.
+
+    Returns:
+        int: The bcrypt cost factor.
+    """
+    return int(hashed_password.split(b"$")[2])
+
+
+def needs_rehash(hashed_password: bytes, rounds: int) -> bool:
+    """
+    Tell whether a hash was created with a different cost factor.
+
+    Args:
+        hashed_password (bytes): The stored bcrypt hash.
+        rounds (int): The cost factor currently in use.
+
+    Returns:
+        bool: True if the password should be hashed again.
+    """
+    return get_rounds(hashed_password) != rounds
+
+
+def calibrate_rounds(
+    target_ms: float = 50.0, samples: int = 5, probe_rounds: int = 8
+) -> int:
+    """
+    Pick the cost factor whose verification takes about target_ms here.
+
+    The median verification time is measured at ``probe_rounds`` and
+    extrapolated, each extra round doubling the work.
+
+    Args:
+        target_ms (float): Wanted p50 verification latency.
+        samples (int): Number of timed verifications.
+        probe_rounds (int): Cost factor the measurement is made with.
+
+    Returns:
+        int: The calibrated cost factor.
+    """
+    hashed_password = hash_password("calibration", probe_rounds)
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        is_valid(hashed_password, "calibration")
+        timings.append((time.perf_counter() - start) * 1000)
+    p50 = statistics.median(timings)
+    rounds = probe_rounds + round(math.log2(target_ms / p50))
+    return max(MIN_ROUNDS, min(MAX_ROUNDS, rounds))
+
+
+def _is_valid_pair(pair: Tuple[bytes, str]) -> bool:
+    """
+    Validate a (hashed_password, password) pair.
+
+    Args:
+        pair (Tuple[bytes, str]): The hashed and plain text passwords.
+
+    Returns:
+        bool: True if the password matches the hashed password.
+    """
+    return is_valid(*pair)
+
+
+def _executor(workers: int = None, use_processes: bool = False) -> Executor:
+    """
+    Create the pool used by the batch APIs.
+
+    bcrypt releases the GIL while hashing, so threads already scale
+    across cores; processes are available for interpreters where it
+    does not.
+
+    Args:
+        workers (int): Number of workers, defaults to the CPU count.
+        use_processes (bool): Use a process pool instead of threads.
+
+    Returns:
+        Executor: The pool to submit work to.
+    """
+    workers = workers or os.cpu_count() or 1
+    if use_processes:
+        return ProcessPoolExecutor(max_workers=workers)
+    return ThreadPoolExecutor(max_workers=workers)
+
+
+def hash_passwords(
+    passwords: Iterable[str], workers: int = None,
+    rounds: int = DEFAULT_ROUNDS, use_processes: bool = False
+) -> List[bytes]:
+    """
+    Hash many passwords in parallel.
+
+    Args:
+        passwords (Iterable[str]): The plain text passwords to hash.
+        workers (int): Number of workers, defaults to the CPU count.
+        rounds (int): The bcrypt cost factor.
+        use_processes (bool): Use a process pool instead of threads.
+
+    Returns:
+        List[bytes]: The hashed passwords, in input order.
+    """
+    with _executor(workers, use_processes) as executor:
+        return list(executor.map(partial(hash_password, rounds=rounds),
+                                 passwords))
+
+
+def verify_many(
+    pairs: Iterable[Tuple[bytes, str]], workers: int = None,
+    use_processes: bool = False
+) -> List[bool]:
+    """
+    Validate many (hashed_password, password) pairs in parallel.
+
+    Args:
+        pairs (Iterable[Tuple[bytes, str]]): The pairs to validate.
+        workers (int): Number of workers, defaults to the CPU count.
+        use_processes (bool): Use a process pool instead of threads.
+
+    Returns:
+        List[bool]: The validation results, in input order.
+    """
+    with _executor(workers, use_processes) as executor:
+        return list(executor.map(_is_valid_pair, pairs))
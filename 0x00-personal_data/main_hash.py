@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Main file: reports bcrypt hashes/sec of hash_passwords across 1..N workers
+
+Usage: ./main_hash.py [passwords] [rounds]   (default: 64 8)
+"""
+import os
+import sys
+import time
+
+encrypt_password = __import__("encrypt_password")
+hash_passwords = encrypt_password.hash_passwords
+is_valid = encrypt_password.is_valid
+verify_many = encrypt_password.verify_many
+
+if __name__ == "__main__":
+    count = max(2, int(sys.argv[1]) if len(sys.argv) > 1 else 64)
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    passwords = ["password{}".format(i) for i in range(count)]
+
+    start = time.perf_counter()
+    hashed_passwords = [
+        encrypt_password.hash_password(password, rounds)
+        for password in passwords
+    ]
+    seconds = time.perf_counter() - start
+    print("inline: {:.1f} hashes/sec".format(count / seconds))
+
+    cpus = os.cpu_count() or 1
+    workers = sorted({1, 2, 4, cpus, 2 * cpus})
+    for use_processes in (False, True):
+        for worker_count in workers:
+            start = time.perf_counter()
+            hashed_passwords = hash_passwords(
+                passwords, worker_count, rounds, use_processes)
+            seconds = time.perf_counter() - start
+            print("{} x{}: {:.1f} hashes/sec".format(
+                "processes" if use_processes else "threads  ",
+                worker_count, count / seconds))
+
+    # Input order is kept
+    assert all(is_valid(hashed_password, password)
+               for hashed_password, password
+               in zip(hashed_passwords, passwords))
+    assert verify_many(zip(hashed_passwords, passwords)) == [True] * count
+    assert not any(verify_many(zip(hashed_passwords,
+                                   passwords[1:] + passwords[:1])))
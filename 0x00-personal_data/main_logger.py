@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Main file: checks that get_logger is idempotent and redacts once per record
+"""
+import contextlib
+import io
+import os
+import tempfile
+import threading
+
+filtered_logger = __import__("filtered_logger")
+get_logger = filtered_logger.get_logger
+get_sink = filtered_logger.get_sink
+Redactor = filtered_logger.Redactor
+
+CALLS = 100
+RECORDS = 10
+message = "name=Bob;email=bob@dylan.com;phone=555-1234;ssn=123-45-6789;" \
+    "password=bobbycool;ip=10.0.0.1;"
+
+# Counts the redaction passes
+redactions = []
+redact = Redactor.redact
+
+
+def counting_redact(self, text):
+    """Redactor.redact, counted"""
+    redactions.append(text)
+    return redact(self, text)
+
+
+Redactor.redact = counting_redact
+
+# Repeated calls do not stack handlers
+for _ in range(CALLS):
+    logger = get_logger(("memory",))
+assert len(logger.handlers) == 1, logger.handlers
+
+# Repeated calls do not start more queue listeners
+get_logger(("memory",), queue_size=100)
+threads = threading.active_count()
+for _ in range(CALLS):
+    logger = get_logger(("memory",), queue_size=100)
+assert len(logger.handlers) == 1, logger.handlers
+assert threading.active_count() == threads
+
+# Several sinks share one redaction pass per record
+with tempfile.TemporaryDirectory() as tmp, \
+        contextlib.redirect_stderr(io.StringIO()) as stderr:
+    filename = os.path.join(tmp, "user_data.log")
+    for _ in range(CALLS):
+        logger = get_logger(("stream", "file", "memory"), filename=filename)
+    assert len(logger.handlers) == 3, logger.handlers
+
+    del redactions[:]
+    for _ in range(RECORDS):
+        logger.info(message)
+    assert len(redactions) == RECORDS, len(redactions)
+
+    for handler in logger.handlers:
+        handler.flush()
+    with open(filename) as f:
+        outputs = [stderr.getvalue(), f.read(),
+                   get_sink("memory").getvalue()]
+    get_logger(("memory",))
+
+for output in outputs:
+    assert output.count("name=***;") == RECORDS, output
+    assert "bobbycool" not in output and "bob@dylan.com" not in output
+
+# The memory sink keeps only the latest records
+logger = get_logger(("memory",))
+for i in range(filtered_logger.MEMORY_SINK_CAPACITY + RECORDS):
+    logger.info("record=%d;", i)
+lines = get_sink("memory").getvalue().splitlines()
+assert len(lines) == filtered_logger.MEMORY_SINK_CAPACITY, len(lines)
+assert lines[-1].endswith("record={};".format(
+    filtered_logger.MEMORY_SINK_CAPACITY + RECORDS - 1)), lines[-1]
+
+# Fields passed as extra are redacted and kept
+for json_lines in (False, True):
+    logger = get_logger(("memory",), json_lines=json_lines)
+    logger.info("ip=10.0.0.1;",
+                extra={"email": "bob@dylan.com", "request_id": 42})
+    output = get_sink("memory").getvalue()
+    assert "bob@dylan.com" not in output and "42" in output, output
+
+# Concurrent calls configure the logger once
+barrier = threading.Barrier(8)
+
+
+def configure():
+    """Waits for the other threads, then configures the logger"""
+    barrier.wait()
+    get_logger(("memory", "stream"))
+
+
+threads = [threading.Thread(target=configure) for _ in range(8)]
+for thread in threads:
+    thread.start()
+for thread in threads:
+    thread.join()
+assert len(logger.handlers) == 2, logger.handlers
+
+print("OK")
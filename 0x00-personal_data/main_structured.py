@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Main file: compares redacting rows as mappings with format-then-regex
+
+Usage: ./main_structured.py [rows ...]   (default: 10000 100000)
+"""
+import logging
+import sys
+import time
+
+filtered_logger = __import__("filtered_logger")
+RedactingFormatter = filtered_logger.RedactingFormatter
+PII_FIELDS = list(filtered_logger.PII_FIELDS)
+
+
+def rows(count):
+    """Returns dicts shaped like the rows of the users table"""
+    return [
+        {"name": "user{}".format(i), "email": "user{}@example.com".format(i),
+         "phone": "555-{:04}".format(i), "ssn": "123-45-{:04}".format(i),
+         "password": "pwd{}".format(i), "ip": "10.0.0.1",
+         "last_login": "2019-11-14T06:16:24", "user_agent": "Mozilla/5.0"}
+        for i in range(count)
+    ]
+
+
+def kv_message(row):
+    """Serializes a row the way main() did before it logged mappings"""
+    return "".join("{}={}; ".format(key, value) for key, value in row.items())
+
+
+def format_all(formatter, messages):
+    """Formats one record per message and returns the time it took"""
+    records = [logging.LogRecord("user_data", logging.INFO, __file__, 0,
+                                 message, None, None)
+               for message in messages]
+    start = time.perf_counter()
+    for record in records:
+        formatter.format(record)
+    return time.perf_counter() - start
+
+
+for count in map(int, sys.argv[1:] or (10000, 100000)):
+    data = rows(count)
+    for json_lines in (False, True):
+        formatter = RedactingFormatter(PII_FIELDS, json_lines)
+        regex = format_all(formatter, [kv_message(row) for row in data])
+        mapping = format_all(formatter, data)
+        print("{:>7} rows, {}: format-then-regex {:.3f}s, mapping {:.3f}s "
+              "({:.1f}x)".format(count, "json" if json_lines else "kv  ",
+                                 regex, mapping, regex / mapping))
@@ -3,7 +3,7 @@
 Route module for the API
 """
 from os import getenv
-from api.v1.auth.auth import Auth
+from api.v1.auth.auth import Auth, PathPolicy
 from api.v1.auth.basic_auth import BasicAuth
 from api.v1.auth.session_auth import SessionAuth
 from api.v1.auth.session_exp_auth import SessionExpAuth
@@ -11,7 +11,9 @@ from api.v1.auth.session_db_auth import SessionDBAuth
 from api.v1.views import app_views
 from flask import Flask, jsonify, abort, request
 from flask_cors import (CORS, cross_origin)
+from models import metrics
 import os
+import time
 
 
 app = Flask(__name__)
@@ -29,26 +31,46 @@ auth_classes = {
 auth_type = getenv("AUTH_TYPE")
 auth = auth_classes.get(auth_type, Auth)()
 
+EXCLUDED_PATHS = PathPolicy([
+    '/api/v1/status/',
+    '/api/v1/unauthorized/',
+    '/api/v1/forbidden/',
+    '/api/v1/auth_session/login/',
+])
+
 
 @app.before_request
 def before_request_fn():
     """Before Request processing
     """
     if auth:
-        excluded_paths = [
-            '/api/v1/status/',
-            '/api/v1/unauthorized/',
-            '/api/v1/forbidden/',
-            '/api/v1/auth_session/login/',
-        ]
-        if auth.require_auth(request.path, excluded_paths):
-            auth_header = auth.authorization_header(request)
-            if auth_header is None and auth.session_cookie(request) is None:
-                abort(401)
-            user = auth.current_user(request)
-            if user is None:
-                abort(403)
-            setattr(request, "current_user", user)
+        with metrics.timer("auth.before_request"):
+            with metrics.timer("auth.require_auth"):
+                required = auth.require_auth(request.path, EXCLUDED_PATHS)
+            if required:
+                with metrics.timer("auth.credentials"):
+                    auth_header = auth.authorization_header(request)
+                    session_id = auth.session_cookie(request)
+                if auth_header is None and session_id is None:
+                    abort(401)
+                with metrics.timer("auth.current_user"):
+                    user = auth.current_user(request)
+                if user is None:
+                    abort(403)
+                setattr(request, "current_user", user)
+    if metrics.ENABLED:
+        setattr(request, "view_started_at", time.perf_counter())
+
+
+@app.after_request
+def after_request_fn(response):
+    """After Request processing: time the view
+    """
+    started_at = getattr(request, "view_started_at", None)
+    if started_at is not None:
+        metrics.observe("view.{}".format(request.endpoint),
+                        time.perf_counter() - started_at)
+    return response
 
 
 @app.errorhandler(404)
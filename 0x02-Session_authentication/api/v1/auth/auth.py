@@ -5,18 +5,57 @@ A module to apply authorization logic.
 
 import fnmatch
 import os
-from typing import List, TypeVar
+import re
+from functools import lru_cache
+from typing import Iterable, List, TypeVar
 
 from flask import request
 
 User = TypeVar("User")
 
 
+class PathPolicy:
+    """A set of fnmatch path patterns compiled for fast matching.
+
+    Patterns without wildcards go in a set; the others are translated
+    and joined into a single regex, so a lookup costs one hash and at
+    most one regex match whatever the number of patterns.
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        """Compiles the patterns."""
+        self.patterns = tuple(patterns)
+        self.exact = frozenset(
+            p for p in self.patterns if not re.search(r"[*?[]", p))
+        wildcards = [p for p in self.patterns if p not in self.exact]
+        self.regex = re.compile("|".join(
+            fnmatch.translate(p) for p in wildcards)) if wildcards else None
+
+    def __len__(self) -> int:
+        """Returns the number of patterns."""
+        return len(self.patterns)
+
+    def __contains__(self, path: str) -> bool:
+        """Returns True if path matches one of the patterns."""
+        if path in self.exact:
+            return True
+        return self.regex is not None and self.regex.match(path) is not None
+
+
+@lru_cache(maxsize=32)
+def get_path_policy(patterns: tuple) -> PathPolicy:
+    """Returns the PathPolicy of patterns, compiled once."""
+    return PathPolicy(patterns)
+
+
 class Auth:
     """[TODO:description]"""
 
     def require_auth(self, path: str, excluded_paths: List[str]) -> bool:
-        """Returns False if path is in the list of excluded paths"""
+        """Returns False if path is in the list of excluded paths
+
+        excluded_paths is a list of fnmatch patterns or a PathPolicy.
+        """
         if path is None:
             return True
 
@@ -27,11 +66,10 @@ class Auth:
         if not path.endswith("/"):
             path += "/"
 
-        for pattern in excluded_paths:
-            if fnmatch.fnmatch(path, pattern):
-                return False
+        if not isinstance(excluded_paths, PathPolicy):
+            excluded_paths = get_path_policy(tuple(excluded_paths))
 
-        return True
+        return path not in excluded_paths
 
     def authorization_header(self, request=None) -> str:
         """Return the value of the header request Authorization"""
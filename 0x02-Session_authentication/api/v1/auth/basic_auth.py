@@ -3,13 +3,64 @@
 Implementation of Basic Authentication
 """
 import base64
+import hashlib
+import hmac
+import os
+import threading
+import time
 from typing import TypeVar
 from models.user import User
 from api.v1.auth.auth import Auth
 
 
 class BasicAuth(Auth):
-    """BasicAuth class inherits from Auth"""
+    """BasicAuth class inherits from Auth
+
+    Successful authentications are cached in a bounded LRU keyed by an
+    HMAC of the raw Authorization header (so credentials are never kept
+    in memory), for BASIC_AUTH_CACHE_TTL seconds (60 by default) and up
+    to BASIC_AUTH_CACHE_SIZE entries (1024 by default, 0 disables the
+    cache). A hit is only used while the user still exists with the same
+    email and password hash, so a password change or a removal
+    invalidates it.
+    """
+
+    def __init__(self):
+        """Initializes the authentication cache and its counters."""
+        self.cache_size = int(os.getenv("BASIC_AUTH_CACHE_SIZE", 1024))
+        self.cache_ttl = float(os.getenv("BASIC_AUTH_CACHE_TTL", 60))
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._cache = {}
+        self._cache_key = os.urandom(32)
+        self._cache_lock = threading.Lock()
+
+    def _cache_get(self, key: bytes) -> TypeVar('User'):
+        """Returns the cached user of a header digest, if still valid."""
+        with self._cache_lock:
+            entry = self._cache.pop(key, None)
+            if entry is not None and entry[3] > time.monotonic():
+                # Re-insert so the dict order stays least recently used
+                self._cache[key] = entry
+        if entry is None:
+            return None
+        user_id, email, password, expires_at = entry
+        user = User.get(user_id)
+        if user is None or user.email != email or \
+                user.password != password or expires_at <= time.monotonic():
+            with self._cache_lock:
+                self._cache.pop(key, None)
+            return None
+        return user
+
+    def _cache_set(self, key: bytes, user: TypeVar('User')):
+        """Caches the user authenticated by a header digest."""
+        with self._cache_lock:
+            self._cache.pop(key, None)
+            while len(self._cache) >= self.cache_size:
+                del self._cache[next(iter(self._cache))]
+            self._cache[key] = (user.id, user.email, user.password,
+                                time.monotonic() + self.cache_ttl)
 
     def extract_base64_authorization_header(
         self,
@@ -82,6 +133,15 @@ class BasicAuth(Auth):
             return None
 
         auth_header = self.authorization_header(request)
+        key = None
+        if self.cache_size > 0 and isinstance(auth_header, str):
+            key = hmac.digest(
+                self._cache_key, auth_header.encode(), hashlib.sha256)
+            user = self._cache_get(key)
+            if user is not None:
+                self.cache_hits += 1
+                return user
+            self.cache_misses += 1
         base64_auth_header = self.extract_base64_authorization_header(
             auth_header)
         decoded_base64_auth_header = self.decode_base64_authorization_header(
@@ -90,5 +150,7 @@ class BasicAuth(Auth):
             decoded_base64_auth_header)
 
         user = self.user_object_from_credentials(user_email, user_pwd)
+        if user is not None and key is not None:
+            self._cache_set(key, user)
 
         return user
@@ -5,6 +5,8 @@ This module applies session authentication logic.
 from uuid import uuid4
 from models.user import User
 from api.v1.auth.auth import Auth
+from api.v1.auth.session_store import (
+    SessionStoreFull, create_session_store)
 
 
 class SessionAuth(Auth):
@@ -13,19 +15,29 @@ class SessionAuth(Auth):
 
     Attributes
     ----------
-    user_id_by_session_id : dict
-        A dictionary that maps session IDs (str) to user IDs (str).
+    user_id_by_session_id : SessionStore
+        A store that maps session IDs (str) to user IDs (str), selected
+        by the SESSION_STORE environment variable.
     """
 
-    user_id_by_session_id = {}
+    def __init__(self, ttl: int = 0):
+        """Initializes the session store; entries live ttl seconds."""
+        self.user_id_by_session_id = create_session_store(ttl)
 
     def create_session(self, user_id: str = None) -> str:
-        """Creates a new session for a user."""
+        """Creates a new session for a user.
+
+        Returns None if the user ID is invalid or the session store
+        has no room left.
+        """
         if user_id is None or not isinstance(user_id, str):
             return None
 
         gen_id = uuid4()
-        self.user_id_by_session_id[str(gen_id)] = user_id
+        try:
+            self.user_id_by_session_id[str(gen_id)] = user_id
+        except SessionStoreFull:
+            return None
         return str(gen_id)
 
     def user_id_for_session_id(self, session_id: str = None) -> str:
@@ -47,6 +59,6 @@ class SessionAuth(Auth):
             cookie_value = self.session_cookie(request)
             user_id = self.user_id_for_session_id(cookie_value)
             if cookie_value and user_id:
-                del self.user_id_by_session_id[cookie_value]
+                self.user_id_by_session_id.pop(cookie_value, None)
                 return True
         return False
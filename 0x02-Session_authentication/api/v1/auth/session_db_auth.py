@@ -3,6 +3,7 @@
 SessionDBAuth handles session authentication with a database.
 """
 
+import os
 from datetime import datetime, timedelta
 
 from api.v1.auth.session_exp_auth import SessionExpAuth
@@ -10,7 +11,17 @@ from models.user_session import UserSession
 
 
 class SessionDBAuth(SessionExpAuth):
-    """A class used to handle session authentication with a database."""
+    """A class used to handle session authentication with a database.
+
+    Sessions are served from the in-process UserSession objects, which
+    are only reloaded when the session file changes on disk (or after
+    SESSION_CACHE_TTL seconds, when set).
+    """
+
+    def __init__(self):
+        """Initializes the SessionDBAuth with the session cache TTL."""
+        super().__init__()
+        self.cache_ttl = float(os.getenv("SESSION_CACHE_TTL", 0))
 
     def create_session(self, user_id=None):
         """Creates a new session for a user and saves it in the database."""
@@ -22,7 +33,7 @@ class SessionDBAuth(SessionExpAuth):
     def user_id_for_session_id(self, session_id=None):
         """Retrieves the user ID associated with a session ID."""
         if session_id:
-            UserSession.load_from_file()
+            UserSession.load_from_file_if_changed(self.cache_ttl)
             user_sessions = UserSession.search({"session_id": session_id})
             if user_sessions:
                 user_session = user_sessions[0]
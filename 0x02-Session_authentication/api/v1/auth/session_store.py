@@ -0,0 +1,524 @@
+#!/usr/bin/env python3
+"""
+Session stores mapping session IDs to user IDs.
+
+Three backends share the SessionStore interface:
+
+- MemorySessionStore: per-process dict with heap-based expiration.
+- MmapSessionStore: fixed-size hash table in a memory-mapped file,
+  shared by every process that maps the same file.
+- SQLiteSessionStore: table in a SQLite database in WAL mode.
+
+create_session_store() picks one from the SESSION_STORE environment
+variable ("memory", "mmap" or "sqlite").
+"""
+import fcntl
+import heapq
+import mmap
+import os
+import sqlite3
+import struct
+import threading
+import time
+import uuid
+import weakref
+from abc import abstractmethod
+from contextlib import contextmanager
+from typing import Iterator, MutableMapping, Union
+
+
+class SessionRecord:
+    """
+    A compact session record.
+
+    Timestamps are epoch seconds rather than datetime objects, and
+    __slots__ avoids a per-instance dict.
+    """
+
+    __slots__ = ("user_id", "created_at", "expires_at")
+
+    def __init__(self, user_id: str, created_at: int, expires_at: int):
+        """Initializes the record."""
+        self.user_id = user_id
+        self.created_at = created_at
+        self.expires_at = expires_at
+
+
+def _key(session_id: str) -> Union[bytes, str]:
+    """Returns the 16 UUID bytes of a canonical UUID session ID."""
+    if isinstance(session_id, str) and len(session_id) == 36:
+        try:
+            parsed = uuid.UUID(session_id)
+        except ValueError:
+            return session_id
+        if str(parsed) == session_id:
+            return parsed.bytes
+    return session_id
+
+
+def _session_id(key: Union[bytes, str]) -> str:
+    """Returns the session ID a key was built from."""
+    if isinstance(key, bytes):
+        return str(uuid.UUID(bytes=key))
+    return key
+
+
+class SessionStoreFull(Exception):
+    """Raised when a fixed-capacity store has no free slot left."""
+
+
+class SessionStore(MutableMapping):
+    """
+    Interface of a mapping of session IDs to user IDs with expiration.
+
+    Entries expire `ttl` seconds after they were written (never when
+    ttl <= 0); reading an expired entry raises KeyError.
+    """
+
+    def __init__(self, ttl: int = 0):
+        """Initializes the store with the time to live of its entries."""
+        self.ttl = ttl
+
+    @abstractmethod
+    def sweep(self) -> int:
+        """Removes every expired session and returns how many were."""
+
+
+class MemorySessionStore(SessionStore):
+    """
+    A per-process session store.
+
+    Every entry expires `ttl` seconds after it was written. Expirations
+    are tracked in a min-heap, so expired entries are removed on each
+    write in amortized O(log n) instead of only being rejected on read.
+    With `max_entries` set, the least recently used entries are evicted
+    once the store is full.
+
+    Entries are SessionRecord objects keyed by the 16 UUID bytes of the
+    session ID, so a session costs a fraction of a dict with a datetime.
+    The insertion order of the plain dict doubles as the LRU order.
+    Heap entries carry an "is a str key" flag so non-UUID keys never get
+    compared with bytes keys.
+    """
+
+    def __init__(self, ttl: int = 0, max_entries: int = 0):
+        """Initializes the store; a ttl <= 0 means entries never expire."""
+        super().__init__(ttl)
+        self.max_entries = max_entries
+        self._entries = {}
+        self._expirations = []
+        self._lock = threading.Lock()
+
+    def __setitem__(self, session_id: str, user_id: str) -> None:
+        """Stores a session and schedules its expiration."""
+        now = int(time.time())
+        expires_at = now + self.ttl if self.ttl > 0 else 0
+        key = _key(session_id)
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = SessionRecord(user_id, now, expires_at)
+            if expires_at:
+                heapq.heappush(self._expirations,
+                               (expires_at, isinstance(key, str), key))
+            self._sweep(now)
+            if self.max_entries > 0:
+                while len(self._entries) > self.max_entries:
+                    del self._entries[next(iter(self._entries))]
+            if len(self._expirations) > 2 * len(self._entries) + 64:
+                self._expirations = [
+                    (record.expires_at, isinstance(key, str), key)
+                    for key, record in self._entries.items()
+                    if record.expires_at
+                ]
+                heapq.heapify(self._expirations)
+
+    def __getitem__(self, session_id: str) -> str:
+        """Returns the user ID, or raises KeyError if expired."""
+        key = _key(session_id)
+        with self._lock:
+            record = self._entries[key]
+            if record.expires_at and record.expires_at < time.time():
+                del self._entries[key]
+                raise KeyError(session_id)
+            if self.max_entries > 0:
+                self._entries[key] = self._entries.pop(key)
+            return record.user_id
+
+    def __delitem__(self, session_id: str) -> None:
+        """Removes a session."""
+        with self._lock:
+            del self._entries[_key(session_id)]
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterates over a snapshot of the stored session IDs."""
+        with self._lock:
+            keys = list(self._entries)
+        return map(_session_id, keys)
+
+    def __len__(self) -> int:
+        """Returns the number of stored sessions."""
+        return len(self._entries)
+
+    def sweep(self) -> int:
+        """Removes every expired session and returns how many were."""
+        with self._lock:
+            return self._sweep(time.time())
+
+    def _sweep(self, now: float) -> int:
+        """Pops due expirations off the heap; the lock must be held."""
+        removed = 0
+        while self._expirations and self._expirations[0][0] < now:
+            expires_at, _, key = heapq.heappop(self._expirations)
+            record = self._entries.get(key)
+            if record is not None and record.expires_at == expires_at:
+                del self._entries[key]
+                removed += 1
+        return removed
+
+
+class MmapSessionStore(SessionStore):
+    """
+    A session store shared between processes through a mapped file.
+
+    The file holds a header (magic, number of deleted slots) followed
+    by a fixed-capacity open-addressing hash table of fixed-size slots
+    (state, 16 UUID bytes, created_at, expires_at, user_id). Writers
+    take an exclusive flock, readers a shared one, so every worker
+    mapping the same file sees the same sessions. Only canonical UUID
+    session IDs and user IDs up to 64 bytes are stored.
+
+    Deleted slots stay as tombstones so probe sequences are not cut;
+    once they exceed a quarter of the capacity the table is rebuilt in
+    place, which keeps lookups from degrading into full scans.
+
+    A forked child reopens the file (see _reopen_mmap_stores): flock
+    locks belong to the open file description, so a descriptor
+    inherited from the parent would not exclude the parent's writes.
+    """
+
+    HEADER = struct.Struct("<8sq")
+    MAGIC = b"SESSMAP1"
+    SLOT = struct.Struct("<B16sqq64s")
+    EMPTY, USED, DELETED = 0, 1, 2
+
+    def __init__(self, file_path: str, capacity: int = 65536,
+                 ttl: int = 0):
+        """Opens or creates the mapped file holding `capacity` slots."""
+        super().__init__(ttl)
+        self.capacity = capacity
+        self.max_tombstones = capacity // 4
+        self._end = self.HEADER.size + capacity * self.SLOT.size
+        self.file_path = file_path
+        self._fd = os.open(file_path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(self._fd).st_size < self._end:
+                os.ftruncate(self._fd, self._end)
+            self._map = mmap.mmap(self._fd, self._end)
+            if self._map[:len(self.MAGIC)] != self.MAGIC:
+                # New file, or written by an older layout: start empty
+                self._map[:] = bytes(self._end)
+                self.HEADER.pack_into(self._map, 0, self.MAGIC, 0)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._lock = threading.Lock()
+        _mmap_stores[id(self)] = self
+
+    def _reopen(self) -> None:
+        """Opens a descriptor of this process's own; called after fork.
+
+        The shared mapping stays valid. The thread lock is replaced
+        too, as a parent thread may have held it when the fork happened.
+        """
+        fd = self._fd
+        self._fd = os.open(self.file_path, os.O_RDWR)
+        os.close(fd)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _locked(self, operation: int):
+        """Holds the thread lock and the given flock on the file."""
+        with self._lock:
+            fcntl.flock(self._fd, operation)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _slots(self, key: bytes) -> Iterator[int]:
+        """Yields the probe sequence of slot offsets for a key."""
+        start = int.from_bytes(key[:8], "little") % self.capacity
+        for i in range(self.capacity):
+            yield (self.HEADER.size +
+                   ((start + i) % self.capacity) * self.SLOT.size)
+
+    def _tombstones(self) -> int:
+        """Returns the number of deleted slots; the lock must be held."""
+        return self.HEADER.unpack_from(self._map, 0)[1]
+
+    def _add_tombstones(self, count: int) -> None:
+        """Adjusts the number of deleted slots; the lock must be held.
+
+        Rebuilds the table once there are too many of them.
+        """
+        tombstones = self._tombstones() + count
+        self.HEADER.pack_into(self._map, 0, self.MAGIC, tombstones)
+        if tombstones > self.max_tombstones:
+            self._rebuild()
+
+    def _rebuild(self) -> None:
+        """Reinserts every live session into an emptied table.
+
+        Drops the tombstones and expired sessions; the exclusive lock
+        must be held.
+        """
+        now = time.time()
+        live = []
+        for offset in range(self.HEADER.size, self._end, self.SLOT.size):
+            slot = self.SLOT.unpack_from(self._map, offset)
+            if slot[0] == self.USED and not 0 < slot[3] < now:
+                live.append(slot)
+        self._map[self.HEADER.size:] = bytes(self._end - self.HEADER.size)
+        for slot in live:
+            for offset in self._slots(slot[1]):
+                if self._map[offset] == self.EMPTY:
+                    self.SLOT.pack_into(self._map, offset, *slot)
+                    break
+        self.HEADER.pack_into(self._map, 0, self.MAGIC, 0)
+
+    def _delete(self, offset: int) -> int:
+        """Frees a slot and returns the number of tombstones it left.
+
+        A slot followed by an empty one ends every probe sequence going
+        through it, so it can be emptied rather than left as a tombstone.
+        """
+        following = offset + self.SLOT.size
+        if following == self._end:
+            following = self.HEADER.size
+        if self._map[following] == self.EMPTY:
+            self._map[offset] = self.EMPTY
+            return 0
+        self._map[offset] = self.DELETED
+        return 1
+
+    def _find(self, key: bytes) -> int:
+        """Returns the offset of the slot holding key, or -1."""
+        for offset in self._slots(key):
+            state, slot_key, _, _, _ = self.SLOT.unpack_from(
+                self._map, offset)
+            if state == self.EMPTY:
+                return -1
+            if state == self.USED and slot_key == key:
+                return offset
+        return -1
+
+    def __setitem__(self, session_id: str, user_id: str) -> None:
+        """Stores a session, reusing deleted or expired slots."""
+        key = _key(session_id)
+        encoded = user_id.encode()
+        if not isinstance(key, bytes) or len(encoded) > 64:
+            raise ValueError("Unsupported session or user ID")
+        now = int(time.time())
+        expires_at = now + self.ttl if self.ttl > 0 else 0
+        with self._locked(fcntl.LOCK_EX):
+            free = self._find(key)
+            if free < 0:
+                for offset in self._slots(key):
+                    state, _, _, slot_expires, _ = self.SLOT.unpack_from(
+                        self._map, offset)
+                    if (state != self.USED
+                            or 0 < slot_expires < now):
+                        free = offset
+                        break
+            if free < 0:
+                raise SessionStoreFull("Session store is full")
+            reused = self._map[free] == self.DELETED
+            self.SLOT.pack_into(self._map, free, self.USED, key, now,
+                                expires_at, encoded)
+            if reused:
+                self._add_tombstones(-1)
+
+    def __getitem__(self, session_id: str) -> str:
+        """Returns the user ID, or raises KeyError if missing or expired."""
+        key = _key(session_id)
+        if not isinstance(key, bytes):
+            raise KeyError(session_id)
+        with self._locked(fcntl.LOCK_SH):
+            offset = self._find(key)
+            if offset < 0:
+                raise KeyError(session_id)
+            _, _, _, expires_at, user_id = self.SLOT.unpack_from(
+                self._map, offset)
+        if 0 < expires_at < time.time():
+            raise KeyError(session_id)
+        return user_id.rstrip(b"\0").decode()
+
+    def __delitem__(self, session_id: str) -> None:
+        """Removes a session."""
+        key = _key(session_id)
+        if not isinstance(key, bytes):
+            raise KeyError(session_id)
+        with self._locked(fcntl.LOCK_EX):
+            offset = self._find(key)
+            if offset < 0:
+                raise KeyError(session_id)
+            self._add_tombstones(self._delete(offset))
+
+    def _live_keys(self) -> list:
+        """Returns the keys of every stored, unexpired session."""
+        now = time.time()
+        keys = []
+        with self._locked(fcntl.LOCK_SH):
+            for offset in range(self.HEADER.size, self._end,
+                                self.SLOT.size):
+                state, key, _, expires_at, _ = self.SLOT.unpack_from(
+                    self._map, offset)
+                if state == self.USED and not 0 < expires_at < now:
+                    keys.append(key)
+        return keys
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterates over the stored session IDs."""
+        return map(_session_id, self._live_keys())
+
+    def __len__(self) -> int:
+        """Returns the number of stored sessions."""
+        return len(self._live_keys())
+
+    def sweep(self) -> int:
+        """Frees every expired slot and returns how many there were."""
+        now = time.time()
+        removed = 0
+        tombstones = 0
+        with self._locked(fcntl.LOCK_EX):
+            for offset in range(self.HEADER.size, self._end,
+                                self.SLOT.size):
+                state, _, _, expires_at, _ = self.SLOT.unpack_from(
+                    self._map, offset)
+                if state == self.USED and 0 < expires_at < now:
+                    tombstones += self._delete(offset)
+                    removed += 1
+            self._add_tombstones(tombstones)
+        return removed
+
+
+# Live MmapSessionStores by id(); mappings are unhashable, so no WeakSet
+_mmap_stores = weakref.WeakValueDictionary()
+
+
+def _reopen_mmap_stores() -> None:
+    """Gives every MmapSessionStore its own descriptor in a new child."""
+    for store in list(_mmap_stores.values()):
+        store._reopen()
+
+
+os.register_at_fork(after_in_child=_reopen_mmap_stores)
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    A session store shared between processes through SQLite.
+
+    The database runs in WAL mode so readers never block the writer;
+    each thread uses its own connection. Expired rows are swept every
+    `sweep_interval` writes through an index on expires_at.
+    """
+
+    def __init__(self, file_path: str, ttl: int = 0,
+                 sweep_interval: int = 100):
+        """Opens the database and creates the sessions table."""
+        super().__init__(ttl)
+        self.file_path = file_path
+        self.sweep_interval = sweep_interval
+        self._writes = 0
+        self._local = threading.local()
+        db = self._db()
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "session_id TEXT PRIMARY KEY, user_id TEXT NOT NULL, "
+            "created_at INTEGER NOT NULL, expires_at INTEGER NOT NULL"
+            ") WITHOUT ROWID")
+        db.execute(
+            "CREATE INDEX IF NOT EXISTS sessions_expires_at "
+            "ON sessions (expires_at)")
+
+    def _db(self) -> sqlite3.Connection:
+        """Returns the connection of the current thread."""
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.file_path, timeout=30,
+                                 isolation_level=None)
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def __setitem__(self, session_id: str, user_id: str) -> None:
+        """Stores a session."""
+        now = int(time.time())
+        expires_at = now + self.ttl if self.ttl > 0 else 0
+        self._db().execute(
+            "INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?)",
+            (session_id, user_id, now, expires_at))
+        self._writes += 1
+        if self._writes % self.sweep_interval == 0:
+            self.sweep()
+
+    def __getitem__(self, session_id: str) -> str:
+        """Returns the user ID, or raises KeyError if missing or expired."""
+        row = self._db().execute(
+            "SELECT user_id FROM sessions WHERE session_id = ? "
+            "AND (expires_at = 0 OR expires_at >= ?)",
+            (session_id, time.time())).fetchone()
+        if row is None:
+            raise KeyError(session_id)
+        return row[0]
+
+    def __delitem__(self, session_id: str) -> None:
+        """Removes a session."""
+        cursor = self._db().execute(
+            "DELETE FROM sessions WHERE session_id = ?", (session_id,))
+        if cursor.rowcount == 0:
+            raise KeyError(session_id)
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterates over the stored session IDs."""
+        rows = self._db().execute(
+            "SELECT session_id FROM sessions "
+            "WHERE expires_at = 0 OR expires_at >= ?",
+            (time.time(),)).fetchall()
+        return (row[0] for row in rows)
+
+    def __len__(self) -> int:
+        """Returns the number of stored sessions."""
+        return self._db().execute(
+            "SELECT COUNT(*) FROM sessions "
+            "WHERE expires_at = 0 OR expires_at >= ?",
+            (time.time(),)).fetchone()[0]
+
+    def sweep(self) -> int:
+        """Removes every expired session and returns how many were."""
+        return self._db().execute(
+            "DELETE FROM sessions WHERE expires_at > 0 AND expires_at < ?",
+            (time.time(),)).rowcount
+
+
+def create_session_store(ttl: int = 0) -> SessionStore:
+    """
+    Creates the session store selected by the environment.
+
+    SESSION_STORE picks the backend ("memory" by default, "mmap" or
+    "sqlite"), SESSION_STORE_PATH the shared file, SESSION_MAX_ENTRIES
+    the LRU cap of the memory store and SESSION_STORE_CAPACITY the slot
+    count of the mmap store.
+    """
+    backend = os.getenv("SESSION_STORE", "memory")
+    if backend == "mmap":
+        return MmapSessionStore(
+            os.getenv("SESSION_STORE_PATH", ".sessions.mmap"),
+            int(os.getenv("SESSION_STORE_CAPACITY", 65536)), ttl)
+    if backend == "sqlite":
+        return SQLiteSessionStore(
+            os.getenv("SESSION_STORE_PATH", ".sessions.sqlite"), ttl)
+    return MemorySessionStore(
+        ttl, int(os.getenv("SESSION_MAX_ENTRIES", 0)))
@@ -1,8 +1,9 @@
 #!/usr/bin/env python3
 """ Module of Index views
 """
-from flask import jsonify, abort
+from flask import Response, jsonify, abort
 from api.v1.views import app_views
+from models import metrics
 
 
 @app_views.route('/status', methods=['GET'], strict_slashes=False)
@@ -26,6 +27,17 @@ def stats() -> str:
     return jsonify(stats)
 
 
+@app_views.route('/metrics', methods=['GET'], strict_slashes=False)
+def view_metrics() -> str:
+    """ GET /api/v1/metrics
+    Return:
+      - the stage duration summaries in the Prometheus text format
+        (empty unless METRICS_ENABLED=1)
+    """
+    return Response(metrics.render(),
+                    mimetype="text/plain; version=0.0.4")
+
+
 @app_views.route('/unauthorized/', strict_slashes=False)
 def unauthorized() -> str:
     """ GET /api/v1/unauthorized
@@ -24,6 +24,8 @@ def session_auth():
     if curr_user[0].is_valid_password(password):
         from api.v1.app import auth
         session_id = auth.create_session(curr_user[0].id)
+        if session_id is None:
+            return jsonify({"error": "no session available"}), 503
         response = jsonify(curr_user[0].to_json())
         session_name = getenv('SESSION_NAME')
         response.set_cookie(session_name, session_id)
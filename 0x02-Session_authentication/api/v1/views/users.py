@@ -2,18 +2,80 @@
 """ Module of Users views
 """
 from api.v1.views import app_views
-from flask import abort, jsonify, request
+from flask import Response, abort, jsonify, request
 from models.user import User
+import base64
+import binascii
+import json
+
+
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(user_id: str) -> str:
+    """ Return the opaque continuation token after a User ID
+    """
+    return base64.urlsafe_b64encode(user_id.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> str:
+    """ Return the User ID of a continuation token, None if invalid
+    """
+    try:
+        return base64.b64decode(cursor + "=" * (-len(cursor) % 4),
+                                altchars=b"-_", validate=True).decode()
+    except (binascii.Error, ValueError):
+        return None
+
+
+def stream_users(after: str = None):
+    """ Yield every User after a User ID as NDJSON lines, by ID
+    """
+    while True:
+        users = User.page(after, MAX_PAGE_SIZE)
+        for user in users:
+            yield json.dumps(user.to_json()) + "\n"
+        if len(users) < MAX_PAGE_SIZE:
+            return
+        after = users[-1].id
 
 
 @app_views.route('/users', methods=['GET'], strict_slashes=False)
 def view_all_users() -> str:
     """ GET /api/v1/users
+    Query parameters (optional):
+      - limit: page size (1 to 1000, 100 by default)
+      - cursor: continuation token of the previous page
+      - stream=ndjson: stream every User as one JSON object per line
     Return:
       - list of all User objects JSON represented
+      - with limit or cursor, one page of User objects ordered by ID;
+        the X-Next-Cursor header holds the token of the next page
+      - 400 if limit or cursor is invalid
     """
-    all_users = [user.to_json() for user in User.all()]
-    return jsonify(all_users)
+    after = None
+    cursor = request.args.get('cursor')
+    if cursor is not None:
+        after = decode_cursor(cursor)
+        if after is None:
+            return jsonify({'error': "Invalid cursor"}), 400
+    if request.args.get('stream') == 'ndjson':
+        return Response(stream_users(after), mimetype='application/x-ndjson')
+    if cursor is None and 'limit' not in request.args:
+        all_users = [user.to_json() for user in User.all()]
+        return jsonify(all_users)
+    try:
+        limit = int(request.args.get('limit', PAGE_SIZE))
+    except ValueError:
+        limit = 0
+    if not 0 < limit <= MAX_PAGE_SIZE:
+        return jsonify({'error': "Invalid limit"}), 400
+    users = User.page(after, limit + 1)
+    response = jsonify([user.to_json() for user in users[:limit]])
+    if len(users) > limit:
+        response.headers['X-Next-Cursor'] = encode_cursor(users[limit - 1].id)
+    return response
 
 
 @app_views.route('/users/<user_id>', methods=['GET'], strict_slashes=False)
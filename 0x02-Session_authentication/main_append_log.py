@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Main file: compares save() throughput of the append log and full rewrites
+
+Usage: ./main_append_log.py [users ...]   (default: 1000 10000)
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+from models.storage import FileStorage
+from models.user import User
+
+SAVES = 1000
+SECONDS = 2
+
+
+def write_users(count):
+    """Writes a .db_User.json snapshot of count users"""
+    users = {}
+    for i in range(count):
+        user = User(email="user{}@example.com".format(i))
+        users[user.id] = user.to_json(True)
+    with open(".db_User.json", "w") as f:
+        json.dump(users, f)
+
+
+def saves_per_second(storage):
+    """Saves up to SAVES new users in about SECONDS, returns count and rate"""
+    saves = 0
+    start = time.perf_counter()
+    while saves < SAVES and time.perf_counter() - start < SECONDS:
+        storage.save(User(email="new{}@example.com".format(saves)))
+        saves += 1
+    return saves, saves / (time.perf_counter() - start)
+
+
+with tempfile.TemporaryDirectory() as tmp:
+    os.chdir(tmp)
+    for count in map(int, sys.argv[1:] or (1000, 10000)):
+        rates = []
+        for append_log in (False, True):
+            for name in os.listdir():
+                os.remove(name)
+            write_users(count)
+            storage = FileStorage(append_log)
+            storage.load(User)
+            saves, rate = saves_per_second(storage)
+            rates.append(rate)
+            reloaded = FileStorage()
+            reloaded.load(User)
+            assert reloaded.count(User) == count + saves
+        print("{:>8} users: rewrite {:.0f} saves/s, append log {:.0f} "
+              "saves/s ({:.0f}x)".format(count, rates[0], rates[1],
+                                         rates[1] / rates[0]))
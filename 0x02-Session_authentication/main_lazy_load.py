@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Main file: compares eager and lazy FileStorage startup as users grow
+
+Usage: ./main_lazy_load.py [users ...]   (default: 10000 50000 100000)
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+from models.storage import FileStorage
+from models.user import User
+
+
+def write_users(count):
+    """Writes a .db_User.json snapshot of count users, returns one id"""
+    users = {}
+    for i in range(count):
+        user = User(email="user{}@example.com".format(i))
+        users[user.id] = user.to_json(True)
+    with open(".db_User.json", "w") as f:
+        json.dump(users, f)
+    return user.id
+
+
+with tempfile.TemporaryDirectory() as tmp:
+    os.chdir(tmp)
+    for count in map(int, sys.argv[1:] or (10000, 50000, 100000)):
+        last_id = write_users(count)
+        timings = []
+        for lazy in (False, True):
+            storage = FileStorage(lazy=lazy)
+            start = time.perf_counter()
+            storage.load(User)
+            loaded = time.perf_counter() - start
+            user = storage.search(User, {
+                "email": "user{}@example.com".format(count - 1)})[0]
+            timings.append((loaded, time.perf_counter() - start))
+            assert user.id == last_id and storage.count(User) == count
+        print("{:>8} users: eager startup {:.3f}s, lazy startup {:.3f}s "
+              "({:.1f}x); first login lookup after {:.3f}s / {:.3f}s".format(
+                  count, timings[0][0], timings[1][0],
+                  timings[0][0] / timings[1][0], timings[0][1],
+                  timings[1][1]))
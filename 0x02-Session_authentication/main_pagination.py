@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Main file: compares the memory and latency of GET /api/v1/users as one
+list, as cursor pages and as an NDJSON stream
+
+Usage: ./main_pagination.py [users]   (default: 100000)
+"""
+import base64
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+USERS = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+LIMIT = 1000
+HEADERS = {"Authorization": "Basic " + base64.b64encode(
+    b"user0@example.com:pwd").decode()}
+
+
+def measure(fetch):
+    """Returns the user count of fetch, its time and peak traced memory"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    count = fetch()
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return count, seconds, peak
+
+
+def fetch_list():
+    """Fetches every user in one response"""
+    return len(client.get("/api/v1/users", headers=HEADERS).get_json())
+
+
+def fetch_pages():
+    """Follows the continuation tokens over every page of LIMIT users"""
+    count = 0
+    path = "/api/v1/users?limit={}".format(LIMIT)
+    while path:
+        response = client.get(path, headers=HEADERS)
+        count += len(response.get_json())
+        cursor = response.headers.get("X-Next-Cursor")
+        path = cursor and "/api/v1/users?limit={}&cursor={}".format(
+            LIMIT, cursor)
+    return count
+
+
+def fetch_stream():
+    """Reads the NDJSON stream line by line as it is produced"""
+    count = 0
+    response = client.get("/api/v1/users?stream=ndjson", headers=HEADERS)
+    for chunk in response.response:
+        count += chunk.count(b"\n" if isinstance(chunk, bytes) else "\n")
+    return count
+
+
+with tempfile.TemporaryDirectory() as tmp:
+    os.chdir(tmp)
+    os.environ["AUTH_TYPE"] = "basic_auth"
+    from models.user import User
+
+    users = {}
+    for i in range(USERS):
+        user = User(email="user{}@example.com".format(i))
+        user.password = "pwd"
+        users[user.id] = user.to_json(True)
+    with open(".db_User.json", "w") as f:
+        json.dump(users, f)
+
+    from api.v1.app import app
+
+    client = app.test_client()
+    start = time.perf_counter()
+    client.get("/api/v1/users?limit={}".format(LIMIT), headers=HEADERS)
+    print("first page of {}: {:.1f}ms".format(
+        LIMIT, (time.perf_counter() - start) * 1e3))
+    for name, fetch in (("list", fetch_list), ("pages", fetch_pages),
+                        ("ndjson", fetch_stream)):
+        count, seconds, peak = measure(fetch)
+        assert count == USERS, (name, count)
+        print("{} users as {:<6}: {:.3f}s, peak {:.1f} MB".format(
+            USERS, name, seconds, peak / 1e6))
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Main file: compares indexed User.search by email with a full scan
+
+Usage: ./main_search.py [users ...]   (default: 10000 100000)
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+from models.storage import FileStorage, _matches
+from models.user import User
+
+LOOKUPS = 200
+
+
+def write_users(count):
+    """Writes a .db_User.json snapshot of count users"""
+    users = {}
+    for i in range(count):
+        user = User(email="user{}@example.com".format(i))
+        users[user.id] = user.to_json(True)
+    with open(".db_User.json", "w") as f:
+        json.dump(users, f)
+
+
+def per_lookup(search, emails):
+    """Returns the mean time of search over emails"""
+    start = time.perf_counter()
+    for email in emails:
+        assert len(search({"email": email})) == 1
+    return (time.perf_counter() - start) / len(emails)
+
+
+with tempfile.TemporaryDirectory() as tmp:
+    os.chdir(tmp)
+    for count in map(int, sys.argv[1:] or (10000, 100000)):
+        write_users(count)
+        storage = FileStorage()
+        storage.load(User)
+        emails = ["user{}@example.com".format(i * count // LOOKUPS)
+                  for i in range(LOOKUPS)]
+        indexed = per_lookup(
+            lambda attributes: storage.search(User, attributes), emails)
+        scan = per_lookup(
+            lambda attributes: [obj for obj in storage.objects(User).values()
+                                if _matches(obj, attributes)],
+            emails[:max(1, LOOKUPS * 1000 // count)])
+        print("{:>8} users: scan {:.1f}us, index {:.1f}us per search "
+              "({:.0f}x)".format(count, scan * 1e6, indexed * 1e6,
+                                 scan / indexed))
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Main file: measures MemorySessionStore throughput and memory, with and
+without SESSION_DURATION, and checks that expired sessions are evicted
+
+Usage: ./main_session_expiry.py [sessions]   (default: 100000)
+"""
+import importlib.util
+import os
+import sys
+import time
+import tracemalloc
+import uuid
+
+spec = importlib.util.spec_from_file_location(
+    "session_store", os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                  "api", "v1", "auth", "session_store.py"))
+session_store = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(session_store)
+MemorySessionStore = session_store.MemorySessionStore
+
+SESSIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+session_ids = [str(uuid.uuid4()) for _ in range(SESSIONS)]
+for ttl in (0, 3600):
+    tracemalloc.start()
+    store = MemorySessionStore(ttl)
+    for session_id in session_ids:
+        store[session_id] = "user"
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del store
+    store = MemorySessionStore(ttl)
+    start = time.perf_counter()
+    for session_id in session_ids:
+        store[session_id] = "user"
+    writes = time.perf_counter() - start
+    start = time.perf_counter()
+    for session_id in session_ids:
+        assert store[session_id] == "user"
+    reads = time.perf_counter() - start
+    print("SESSION_DURATION={:<4}: {:.0f} writes/s, {:.0f} reads/s, "
+          "{:.1f} MB for {} sessions".format(
+              ttl, SESSIONS / writes, SESSIONS / reads, size / 1e6,
+              SESSIONS))
+    del store
+
+# Sessions that expired are evicted by later writes, not only rejected
+store = MemorySessionStore(1)
+peak = 0
+start = time.monotonic()
+while time.monotonic() - start < 3:
+    for _ in range(1000):
+        store[str(uuid.uuid4())] = "user"
+    peak = max(peak, len(store))
+written = len(store)
+# Expiration times are whole seconds
+time.sleep(2.1)
+store[str(uuid.uuid4())] = "user"
+assert len(store) == 1, len(store)
+print("expiry: at most {} live sessions, {} before the last sweep, 1 after"
+      .format(peak, written))
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Main file: reports the bytes per session of the old per-session dicts
+and of MemorySessionStore records
+
+Usage: ./main_session_memory.py [sessions]   (default: 100000)
+"""
+import importlib.util
+import os
+import sys
+import tracemalloc
+import uuid
+from datetime import datetime
+
+spec = importlib.util.spec_from_file_location(
+    "session_store", os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                  "api", "v1", "auth", "session_store.py"))
+session_store = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(session_store)
+MemorySessionStore = session_store.MemorySessionStore
+
+SESSIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+
+def bytes_per_session(fill):
+    """Returns the memory fill keeps per session, as traced
+
+    Session IDs are created inside the traced section, as a login
+    does, so each store pays for the keys it keeps.
+    """
+    user_id = str(uuid.uuid4())
+    tracemalloc.start()
+    kept = fill(user_id)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return size / SESSIONS
+
+
+def fill_dicts(user_id):
+    """Stores sessions the way SessionExpAuth did"""
+    sessions = {}
+    for _ in range(SESSIONS):
+        sessions[str(uuid.uuid4())] = {"user_id": user_id,
+                                       "created_at": datetime.now()}
+    return sessions
+
+
+def fill_store(user_id, ttl=3600):
+    """Stores sessions in a MemorySessionStore"""
+    store = MemorySessionStore(ttl)
+    for _ in range(SESSIONS):
+        store[str(uuid.uuid4())] = user_id
+    return store
+
+
+before = bytes_per_session(fill_dicts)
+print("{} sessions: dict {:.0f} B per session".format(SESSIONS, before))
+for ttl in (3600, 0):
+    after = bytes_per_session(lambda user_id: fill_store(user_id, ttl))
+    print("{} sessions: record {:.0f} B per session with{} a duration "
+          "({:.1f}x smaller)".format(SESSIONS, after, "" if ttl else "out",
+                                     before / after))
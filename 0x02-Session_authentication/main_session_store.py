@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Main file: checks MmapSessionStore across processes, forks and churn
+"""
+import fcntl
+import importlib.util
+import multiprocessing
+import os
+import tempfile
+import time
+import uuid
+
+spec = importlib.util.spec_from_file_location(
+    "session_store", os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                  "api", "v1", "auth", "session_store.py"))
+session_store = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(session_store)
+MmapSessionStore = session_store.MmapSessionStore
+
+CAPACITY = 1024
+WORKERS = 4
+SESSIONS = 200
+
+
+def worker(file_path, worker_id, queue):
+    """Stores SESSIONS sessions, deletes every other one, reports the rest"""
+    store = MmapSessionStore(file_path, CAPACITY)
+    kept = {}
+    for i in range(SESSIONS):
+        session_id = str(uuid.uuid4())
+        store[session_id] = "user-{}-{}".format(worker_id, i)
+        if i % 2:
+            del store[session_id]
+        else:
+            kept[session_id] = "user-{}-{}".format(worker_id, i)
+    queue.put(kept)
+
+
+def forked_worker(store, queue):
+    """Reports whether the parent's exclusive lock blocks this process"""
+    try:
+        fcntl.flock(store._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        queue.put(True)
+    else:
+        queue.put(False)
+
+
+def miss_time(store):
+    """Returns the mean time of a lookup of a missing session"""
+    start = time.perf_counter()
+    for _ in range(100):
+        store.get(str(uuid.uuid4()))
+    return (time.perf_counter() - start) / 100
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp:
+        # Sessions written by several processes are seen by all of them
+        file_path = os.path.join(tmp, "sessions.mmap")
+        ctx = multiprocessing.get_context("spawn")
+        queue = ctx.Queue()
+        processes = [ctx.Process(target=worker, args=(file_path, i, queue))
+                     for i in range(WORKERS)]
+        for process in processes:
+            process.start()
+        expected = {}
+        for _ in processes:
+            expected.update(queue.get())
+        for process in processes:
+            process.join()
+            assert process.exitcode == 0
+        store = MmapSessionStore(file_path, CAPACITY)
+        assert len(store) == WORKERS * SESSIONS // 2
+        for session_id, user_id in expected.items():
+            assert store[session_id] == user_id
+        print("{} processes: OK".format(WORKERS))
+
+        # Workers forked after the store was opened, as with
+        # gunicorn --preload, are still excluded by the parent's lock
+        store = MmapSessionStore(os.path.join(tmp, "forked.mmap"),
+                                 CAPACITY)
+        ctx = multiprocessing.get_context("fork")
+        queue = ctx.Queue()
+        with store._locked(fcntl.LOCK_EX):
+            process = ctx.Process(target=forked_worker, args=(store, queue))
+            process.start()
+            assert queue.get(), "a forked worker ignored the parent's lock"
+            process.join()
+        assert process.exitcode == 0
+        store[str(uuid.uuid4())] = "user"
+        print("fork: OK")
+
+        # A full table raises SessionStoreFull
+        store = MmapSessionStore(os.path.join(tmp, "full.mmap"), 8)
+        for _ in range(8):
+            store[str(uuid.uuid4())] = "user"
+        try:
+            store[str(uuid.uuid4())] = "user"
+        except session_store.SessionStoreFull:
+            print("full: OK")
+        else:
+            raise AssertionError("a full store accepted a session")
+
+        # Login/logout churn does not leave the table full of tombstones
+        store = MmapSessionStore(os.path.join(tmp, "churn.mmap"), CAPACITY)
+        fresh = miss_time(store)
+        for _ in range(10 * CAPACITY):
+            session_id = str(uuid.uuid4())
+            store[session_id] = "user"
+            del store[session_id]
+        with store._locked(fcntl.LOCK_SH):
+            assert store._tombstones() <= store.max_tombstones
+        churned = miss_time(store)
+        assert churned < 5 * fresh + 0.0001, (fresh, churned)
+        print("churn: miss {:.1f}us fresh, {:.1f}us after".format(
+            fresh * 1e6, churned * 1e6))
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Main file: compares the startup, get and search latency of the file and
+SQLite storage engines
+
+Usage: ./main_storage.py [users ...]   (default: 10000 100000)
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+from models.storage import FileStorage, SQLiteStorage
+from models.user import User
+
+LOOKUPS = 1000
+
+
+def fill(count):
+    """Writes count users to .db_User.json and .db.sqlite, returns them"""
+    users = [User(email="user{}@example.com".format(i))
+             for i in range(count)]
+    with open(".db_User.json", "w") as f:
+        json.dump({user.id: user.to_json(True) for user in users}, f)
+    storage = SQLiteStorage(".db.sqlite")
+    storage.load(User)
+    storage._db().execute("BEGIN")
+    for user in users:
+        storage.save(user)
+    storage._db().execute("COMMIT")
+    return users
+
+
+def per_call(call, args):
+    """Returns the mean time of call over args"""
+    start = time.perf_counter()
+    for arg in args:
+        call(arg)
+    return (time.perf_counter() - start) / len(args)
+
+
+with tempfile.TemporaryDirectory() as tmp:
+    os.chdir(tmp)
+    for count in map(int, sys.argv[1:] or (10000, 100000)):
+        for name in os.listdir():
+            os.remove(name)
+        users = fill(count)
+        sample = users[::max(1, count // LOOKUPS)]
+        for storage in (FileStorage(), SQLiteStorage(".db.sqlite")):
+            start = time.perf_counter()
+            storage.load(User)
+            startup = time.perf_counter() - start
+            assert storage.count(User) == count
+            get = per_call(lambda user: storage.get(User, user.id), sample)
+            search = per_call(
+                lambda user: storage.search(User, {"email": user.email}),
+                sample)
+            assert storage.get(User, users[-1].id).email == users[-1].email
+            print("{:>8} users, {:<13}: startup {:.3f}s, get {:.1f}us, "
+                  "search {:.1f}us".format(
+                      count, type(storage).__name__, startup, get * 1e6,
+                      search * 1e6))
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Main file: compares the timestamp codec with strptime/strftime, alone
+and through loading and serializing users
+
+Usage: ./main_timestamps.py [users]   (default: 50000)
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import models.base
+from models.base import TIMESTAMP_FORMAT, format_timestamp, parse_timestamp
+from models.storage import FileStorage
+from models.user import User
+
+USERS = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+
+
+def strptime(value):
+    """The parser Base used before the codec"""
+    return datetime.strptime(value, TIMESTAMP_FORMAT)
+
+
+def strftime(value):
+    """The formatter Base used before the codec"""
+    return value.strftime(TIMESTAMP_FORMAT)
+
+
+def timed(call, values):
+    """Returns the results of call over values and the time it took"""
+    start = time.perf_counter()
+    results = [call(value) for value in values]
+    return results, time.perf_counter() - start
+
+
+# The codec round-trips exactly and agrees with strptime/strftime
+start = datetime(2000, 1, 1)
+datetimes = [start + timedelta(seconds=i * 7919) for i in range(USERS)]
+strings, old_format = timed(strftime, datetimes)
+new_strings, new_format = timed(format_timestamp, datetimes)
+assert new_strings == strings
+parsed, old_parse = timed(strptime, strings)
+new_parsed, new_parse = timed(parse_timestamp, strings)
+assert new_parsed == parsed == datetimes
+print("{} timestamps: parse {:.3f}s -> {:.3f}s, format {:.3f}s -> {:.3f}s"
+      .format(USERS, old_parse, new_parse, old_format, new_format))
+
+# End to end: loading users parses, serializing them formats
+with tempfile.TemporaryDirectory() as tmp:
+    os.chdir(tmp)
+    with open(".db_User.json", "w") as f:
+        json.dump({user.id: user.to_json(True) for user in (
+            User(email="user{}@example.com".format(i))
+            for i in range(USERS))}, f)
+    codecs = (("strptime/strftime", strptime, strftime),
+              ("codec", parse_timestamp, format_timestamp))
+    outputs = []
+    for name, parse, format_ in codecs:
+        models.base.parse_timestamp = parse
+        models.base.format_timestamp = format_
+        storage = FileStorage()
+        start = time.perf_counter()
+        storage.load(User)
+        load = time.perf_counter() - start
+        users, serialize = timed(lambda user: user.to_json(),
+                                 list(storage.objects(User).values()))
+        outputs.append(users)
+        print("{} users, {:<17}: load {:.3f}s, to_json {:.3f}s".format(
+            USERS, name, load, serialize))
+    assert outputs[0] == outputs[1]
@@ -3,35 +3,63 @@
 """
 from datetime import datetime
 from typing import TypeVar, List, Iterable
-from os import path
-import json
 import uuid
 
+from models.metrics import timed
+from models.storage import create_storage
+
 
 TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
-DATA = {}
+STORAGE = create_storage()
+
+
+def parse_timestamp(value: str) -> datetime:
+    """ Parse a TIMESTAMP_FORMAT string
+
+    Canonical strings (zero-padded, 19 characters) go through the C
+    fromisoformat parser; anything else falls back to strptime so the
+    accepted inputs are unchanged.
+    """
+    if (len(value) == 19 and value[4] == value[7] == "-" and
+            value[10] == "T" and value[13] == value[16] == ":"):
+        try:
+            parsed = datetime.fromisoformat(value)
+        except ValueError:
+            pass
+        else:
+            if parsed.tzinfo is None:
+                return parsed
+    return datetime.strptime(value, TIMESTAMP_FORMAT)
+
+
+def format_timestamp(value: datetime) -> str:
+    """ Format a datetime with TIMESTAMP_FORMAT
+    """
+    if value.tzinfo is None and value.year >= 1000:
+        return value.isoformat(timespec="seconds")
+    return value.strftime(TIMESTAMP_FORMAT)
 
 
 class Base():
     """ Base class
+
+    Objects are kept by the storage engine STORAGE (see
+    models.storage). Attributes listed in `indexed_attributes` are
+    indexed by the engine for equality searches.
     """
 
+    indexed_attributes = ()
+
     def __init__(self, *args: list, **kwargs: dict):
         """ Initialize a Base instance
         """
-        s_class = str(self.__class__.__name__)
-        if DATA.get(s_class) is None:
-            DATA[s_class] = {}
-
         self.id = kwargs.get('id', str(uuid.uuid4()))
         if kwargs.get('created_at') is not None:
-            self.created_at = datetime.strptime(kwargs.get('created_at'),
-                                                TIMESTAMP_FORMAT)
+            self.created_at = parse_timestamp(kwargs.get('created_at'))
         else:
             self.created_at = datetime.utcnow()
         if kwargs.get('updated_at') is not None:
-            self.updated_at = datetime.strptime(kwargs.get('updated_at'),
-                                                TIMESTAMP_FORMAT)
+            self.updated_at = parse_timestamp(kwargs.get('updated_at'))
         else:
             self.updated_at = datetime.utcnow()
 
@@ -52,86 +80,81 @@ class Base():
             if not for_serialization and key[0] == '_':
                 continue
             if type(value) is datetime:
-                result[key] = value.strftime(TIMESTAMP_FORMAT)
+                result[key] = format_timestamp(value)
             else:
                 result[key] = value
         return result
 
     @classmethod
+    @timed("storage.load")
     def load_from_file(cls):
         """ Load all objects from file
         """
-        s_class = cls.__name__
-        file_path = ".db_{}.json".format(s_class)
-        DATA[s_class] = {}
-        if not path.exists(file_path):
-            return
+        STORAGE.load(cls)
 
-        with open(file_path, 'r') as f:
-            objs_json = json.load(f)
-            for obj_id, obj_json in objs_json.items():
-                DATA[s_class][obj_id] = cls(**obj_json)
+    @classmethod
+    @timed("storage.load_if_changed")
+    def load_from_file_if_changed(cls, max_age: float = 0) -> bool:
+        """ Reload all objects only if their storage changed
+
+        With a positive max_age, objects loaded more than max_age
+        seconds ago are reloaded even if the storage looks unchanged.
+        Return True if the objects were reloaded.
+        """
+        return STORAGE.load_if_changed(cls, max_age)
 
     @classmethod
+    @timed("storage.persist")
     def save_to_file(cls):
         """ Save all objects to file
         """
-        s_class = cls.__name__
-        file_path = ".db_{}.json".format(s_class)
-        objs_json = {}
-        for obj_id, obj in DATA[s_class].items():
-            objs_json[obj_id] = obj.to_json(True)
-
-        with open(file_path, 'w') as f:
-            json.dump(objs_json, f)
+        STORAGE.persist(cls)
 
+    @timed("storage.save")
     def save(self):
         """ Save current object
         """
-        s_class = self.__class__.__name__
         self.updated_at = datetime.utcnow()
-        DATA[s_class][self.id] = self
-        self.__class__.save_to_file()
+        STORAGE.save(self)
 
+    @timed("storage.remove")
     def remove(self):
         """ Remove object
         """
-        s_class = self.__class__.__name__
-        if DATA[s_class].get(self.id) is not None:
-            del DATA[s_class][self.id]
-            self.__class__.save_to_file()
+        STORAGE.remove(self)
 
     @classmethod
+    @timed("storage.count")
     def count(cls) -> int:
         """ Count all objects
         """
-        s_class = cls.__name__
-        return len(DATA[s_class].keys())
+        return STORAGE.count(cls)
 
     @classmethod
+    @timed("storage.all")
     def all(cls) -> Iterable[TypeVar('Base')]:
         """ Return all objects
         """
-        return cls.search()
+        return STORAGE.all(cls)
 
     @classmethod
+    @timed("storage.get")
     def get(cls, id: str) -> TypeVar('Base'):
         """ Return one object by ID
         """
-        s_class = cls.__name__
-        return DATA[s_class].get(id)
+        return STORAGE.get(cls, id)
 
     @classmethod
+    @timed("storage.search")
     def search(cls, attributes: dict = {}) -> List[TypeVar('Base')]:
         """ Search all objects with matching attributes
         """
-        s_class = cls.__name__
-        def _search(obj):
-            if len(attributes) == 0:
-                return True
-            for k, v in attributes.items():
-                if (getattr(obj, k) != v):
-                    return False
-            return True
-        
-        return list(filter(_search, DATA[s_class].values()))
+        return STORAGE.search(cls, attributes)
+
+    @classmethod
+    @timed("storage.page")
+    def page(cls, after: str = None,
+             limit: int = 100) -> List[TypeVar('Base')]:
+        """ Return up to limit objects ordered by ID, with IDs after after
+        """
+        return STORAGE.page(cls, after, limit)
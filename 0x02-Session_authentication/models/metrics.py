@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+""" Metrics module
+
+In-process latency histograms for the hot paths of the API, exported
+in the Prometheus text format. Recording is enabled with
+METRICS_ENABLED=1; when disabled, timed() returns the function itself
+and timer() a shared no-op context, so the hooks cost (almost) nothing.
+"""
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+from os import getenv
+import random
+import threading
+import time
+
+
+ENABLED = getenv("METRICS_ENABLED", "0") == "1"
+RESERVOIR_SIZE = 1024
+QUANTILES = (0.5, 0.95, 0.99)
+_NULL_TIMER = nullcontext()
+
+
+class Histogram():
+    """ Latency histogram of one stage
+
+    Keeps the count and sum of every observation, and a uniform sample
+    of at most RESERVOIR_SIZE of them (reservoir sampling) to estimate
+    the quantiles in bounded memory.
+    """
+
+    def __init__(self, stage: str):
+        """ Initialize an empty histogram
+        """
+        self.stage = stage
+        self.count = 0
+        self.sum = 0.0
+        self.samples = []
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        """ Record one duration
+        """
+        with self._lock:
+            self.count += 1
+            self.sum += seconds
+            if len(self.samples) < RESERVOIR_SIZE:
+                self.samples.append(seconds)
+            else:
+                i = random.randrange(self.count)
+                if i < RESERVOIR_SIZE:
+                    self.samples[i] = seconds
+
+    def quantiles(self) -> dict:
+        """ Return the estimated duration of each of QUANTILES
+        """
+        with self._lock:
+            samples = sorted(self.samples)
+        if not samples:
+            return {q: 0.0 for q in QUANTILES}
+        return {q: samples[min(int(q * len(samples)), len(samples) - 1)]
+                for q in QUANTILES}
+
+
+_histograms = {}
+_histograms_lock = threading.Lock()
+
+
+def histogram(stage: str) -> Histogram:
+    """ Return the histogram of a stage, created on first use
+    """
+    hist = _histograms.get(stage)
+    if hist is None:
+        with _histograms_lock:
+            hist = _histograms.setdefault(stage, Histogram(stage))
+    return hist
+
+
+def observe(stage: str, seconds: float):
+    """ Record one duration of a stage if metrics are enabled
+    """
+    if ENABLED:
+        histogram(stage).observe(seconds)
+
+
+@contextmanager
+def _timer(stage: str):
+    """ Time the body of a with statement
+    """
+    hist = histogram(stage)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        hist.observe(time.perf_counter() - start)
+
+
+def timer(stage: str):
+    """ Return a context manager timing a stage if metrics are enabled
+    """
+    return _timer(stage) if ENABLED else _NULL_TIMER
+
+
+def timed(stage: str):
+    """ Decorator timing every call of a function as a stage
+
+    When metrics are disabled the function is returned unchanged.
+    """
+    def decorator(func):
+        if not ENABLED:
+            return func
+        hist = histogram(stage)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                hist.observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def render() -> str:
+    """ Return every histogram in the Prometheus text format
+    """
+    lines = [
+        "# HELP stage_duration_seconds Duration of the API stages.",
+        "# TYPE stage_duration_seconds summary",
+    ]
+    for stage, hist in sorted(_histograms.items()):
+        label = stage.replace("\\", "\\\\").replace('"', '\\"')
+        for q, value in hist.quantiles().items():
+            lines.append(
+                'stage_duration_seconds{{stage="{}",quantile="{}"}} {!r}'
+                .format(label, q, value))
+        lines.append('stage_duration_seconds_sum{{stage="{}"}} {!r}'.format(
+            label, hist.sum))
+        lines.append('stage_duration_seconds_count{{stage="{}"}} {}'.format(
+            label, hist.count))
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,663 @@
+#!/usr/bin/env python3
+""" Storage engines module
+
+A storage engine keeps the objects of every Base subclass. Two engines
+implement the Storage interface:
+
+- FileStorage (default): all objects live in memory and are persisted
+  to `.db_<Class>.json` files, optionally through an append log.
+- SQLiteStorage: objects live in a SQLite database, one table per
+  class, with an indexed column per `indexed_attributes` entry.
+"""
+from abc import ABC, abstractmethod
+from os import getenv, path
+from typing import TypeVar, List, Iterable, Iterator, MutableMapping
+import bisect
+import fcntl
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+class Storage(ABC):
+    """ Storage engine interface
+    """
+
+    @abstractmethod
+    def load(self, cls):
+        """ Load all objects of a class from persistent storage
+        """
+
+    @abstractmethod
+    def load_if_changed(self, cls, max_age: float = 0) -> bool:
+        """ Reload the objects of a class if its storage changed
+        """
+
+    @abstractmethod
+    def persist(self, cls):
+        """ Write all objects of a class to persistent storage
+        """
+
+    @abstractmethod
+    def save(self, obj):
+        """ Save one object
+        """
+
+    @abstractmethod
+    def remove(self, obj):
+        """ Remove one object
+        """
+
+    @abstractmethod
+    def count(self, cls) -> int:
+        """ Count all objects of a class
+        """
+
+    def all(self, cls) -> Iterable[TypeVar('Base')]:
+        """ Return all objects of a class
+        """
+        return self.search(cls)
+
+    @abstractmethod
+    def get(self, cls, id: str) -> TypeVar('Base'):
+        """ Return one object by ID
+        """
+
+    @abstractmethod
+    def search(self, cls, attributes: dict = {}) -> List[TypeVar('Base')]:
+        """ Search all objects of a class with matching attributes
+        """
+
+    def page(self, cls, after: str = None,
+             limit: int = 100) -> List[TypeVar('Base')]:
+        """ Return up to limit objects ordered by ID, with IDs after after
+        """
+        objs = sorted(self.search(cls), key=lambda obj: obj.id)
+        if after is not None:
+            objs = [obj for obj in objs if obj.id > after]
+        return objs[:limit]
+
+
+def _matches(obj, attributes: dict) -> bool:
+    """ Return True if obj has every attribute value of attributes
+    """
+    for k, v in attributes.items():
+        if (getattr(obj, k) != v):
+            return False
+    return True
+
+
+class LazyObjects(MutableMapping):
+    """ id -> object mapping that builds objects on first access
+
+    Entries loaded from file are kept as their raw JSON dict, so loading
+    skips the constructor (and its timestamp parsing) of every object
+    that is never read. Insertion order is kept like a dict's.
+    """
+
+    def __init__(self, cls):
+        """ Initialize an empty mapping of objects of cls
+        """
+        self._cls = cls
+        self._items = {}
+
+    def set_raw(self, obj_id: str, obj_json: dict):
+        """ Store the raw JSON of an object, built on first access
+        """
+        self._items[obj_id] = obj_json
+
+    def peek(self, obj_id: str, attr: str):
+        """ Return an attribute of an object without building it
+        """
+        item = self._items[obj_id]
+        if type(item) is dict:
+            return item.get(attr)
+        return getattr(item, attr, None)
+
+    def to_json(self) -> dict:
+        """ Return the serialization of every object
+        """
+        return {
+            obj_id: item if type(item) is dict else item.to_json(True)
+            for obj_id, item in self._items.items()
+        }
+
+    def __getitem__(self, obj_id: str):
+        """ Return an object, building it from its JSON if needed
+        """
+        item = self._items[obj_id]
+        if type(item) is dict:
+            item = self._items[obj_id] = self._cls(**item)
+        return item
+
+    def __setitem__(self, obj_id: str, obj):
+        """ Store a built object
+        """
+        self._items[obj_id] = obj
+
+    def __delitem__(self, obj_id: str):
+        """ Remove an object
+        """
+        del self._items[obj_id]
+
+    def __iter__(self) -> Iterator[str]:
+        """ Iterate over the object IDs
+        """
+        return iter(self._items)
+
+    def __len__(self) -> int:
+        """ Return the number of objects
+        """
+        return len(self._items)
+
+
+class FileStorage(Storage):
+    """ In-memory storage persisted to JSON files
+
+    Attributes listed in `indexed_attributes` get a secondary index
+    (value -> ids) kept up to date by save(), remove() and load();
+    search() uses it for equality lookups.
+
+    With `append_log`, save() and remove() append one JSON line per
+    mutation to `.db_<Class>.log` instead of rewriting the snapshot;
+    the log is compacted once it grows past `compact_threshold` bytes.
+    Appends hold a shared flock on the log and compaction an exclusive
+    one, so workers sharing the files do not lose each other's writes.
+
+    With `lazy`, load() keeps the raw JSON of each object in a
+    LazyObjects mapping and only builds the objects that are accessed.
+    """
+
+    def __init__(self, append_log: bool = False,
+                 compact_threshold: int = 1024 * 1024, lazy: bool = False):
+        """ Initialize an empty storage
+        """
+        self.append_log = append_log
+        self.compact_threshold = compact_threshold
+        self.lazy = lazy
+        self.data = {}
+        self.file_signatures = {}
+        self.loaded_at = {}
+        self.indexes = {}
+        self.indexed_values = {}
+        self.sorted_ids = {}
+
+    def objects(self, cls) -> dict:
+        """ Return the id -> object dict of a class
+        """
+        return self.data.setdefault(cls.__name__, {})
+
+    def load(self, cls):
+        """ Load all objects from file
+
+        The snapshot `.db_<Class>.json` is loaded first, then the
+        mutations appended to `.db_<Class>.log` are replayed on top.
+        """
+        s_class = cls.__name__
+        file_path = ".db_{}.json".format(s_class)
+        log_path = ".db_{}.log".format(s_class)
+        self.file_signatures[s_class] = self._file_signature(cls)
+        self.loaded_at[s_class] = time.monotonic()
+        self.sorted_ids.pop(s_class, None)
+        if self.lazy:
+            objs = self.data[s_class] = LazyObjects(cls)
+            add = objs.set_raw
+        else:
+            objs = self.data[s_class] = {}
+
+            def add(obj_id, obj_json):
+                objs[obj_id] = cls(**obj_json)
+        if path.exists(file_path):
+            with open(file_path, 'r') as f:
+                objs_json = json.load(f)
+                for obj_id, obj_json in objs_json.items():
+                    add(obj_id, obj_json)
+        if path.exists(log_path):
+            with open(log_path, 'r') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # Torn write of a line after a crash; the next
+                        # append starts on a new line (see _append_to_log)
+                        continue
+                    if entry["op"] == "save":
+                        obj_json = entry["obj"]
+                        add(obj_json["id"], obj_json)
+                    else:
+                        objs.pop(entry["id"], None)
+        self._rebuild_indexes(cls)
+
+    def _file_signature(self, cls) -> tuple:
+        """ Return the (inode, size, mtime) of the snapshot and log files
+        """
+        s_class = cls.__name__
+        signature = []
+        for file_path in (".db_{}.json".format(s_class),
+                          ".db_{}.log".format(s_class)):
+            try:
+                st = os.stat(file_path)
+            except FileNotFoundError:
+                signature.append(None)
+                continue
+            signature.append((st.st_ino, st.st_size, st.st_mtime_ns))
+        return tuple(signature)
+
+    def load_if_changed(self, cls, max_age: float = 0) -> bool:
+        """ Reload all objects only if their files changed on disk
+
+        With a positive max_age, objects loaded more than max_age
+        seconds ago are reloaded even if the files look unchanged.
+        Return True if the objects were reloaded.
+        """
+        s_class = cls.__name__
+        if (
+            s_class in self.file_signatures
+            and self.file_signatures[s_class] == self._file_signature(cls)
+            and (max_age <= 0
+                 or time.monotonic() - self.loaded_at[s_class] < max_age)
+        ):
+            return False
+        self.load(cls)
+        return True
+
+    def _rebuild_indexes(self, cls):
+        """ Rebuild the secondary indexes of a class from its objects
+        """
+        s_class = cls.__name__
+        self.indexes[s_class] = {
+            attr: {} for attr in cls.indexed_attributes}
+        self.indexed_values[s_class] = {}
+        objs = self.objects(cls)
+        if isinstance(objs, LazyObjects):
+            for obj_id in objs:
+                self._index_values(cls, obj_id, {
+                    attr: objs.peek(obj_id, attr)
+                    for attr in cls.indexed_attributes})
+        else:
+            for obj in objs.values():
+                self._index(obj)
+
+    def _index(self, obj):
+        """ Add an object to the secondary indexes
+        """
+        s_class = obj.__class__.__name__
+        if s_class not in self.indexes:
+            self._rebuild_indexes(obj.__class__)
+            return
+        self._unindex(obj)
+        self._index_values(obj.__class__, obj.id, {
+            attr: getattr(obj, attr, None)
+            for attr in obj.indexed_attributes})
+
+    def _index_values(self, cls, obj_id: str, attributes: dict):
+        """ Add the indexed attribute values of an object to the indexes
+        """
+        s_class = cls.__name__
+        values = {}
+        for attr, value in attributes.items():
+            try:
+                self.indexes[s_class][attr].setdefault(
+                    value, {})[obj_id] = None
+            except TypeError:
+                continue
+            values[attr] = value
+        self.indexed_values[s_class][obj_id] = values
+
+    def _unindex(self, obj):
+        """ Remove an object from the secondary indexes
+        """
+        s_class = obj.__class__.__name__
+        values = self.indexed_values.get(s_class, {}).pop(obj.id, {})
+        for attr, value in values.items():
+            ids = self.indexes[s_class][attr].get(value)
+            if ids is not None:
+                ids.pop(obj.id, None)
+                if len(ids) == 0:
+                    del self.indexes[s_class][attr][value]
+
+    def persist(self, cls):
+        """ Save all objects to file
+
+        The snapshot is written to a temporary file and renamed over the
+        previous one. In append-log mode, where every mutation is
+        already in the log, this compacts the log instead: see
+        _compact().
+        """
+        if self.append_log:
+            self._compact(cls)
+            return
+        s_class = cls.__name__
+        log_path = ".db_{}.log".format(s_class)
+        fresh = self.file_signatures.get(s_class) == \
+            self._file_signature(cls)
+        self._write_snapshot(cls)
+        if path.exists(log_path):
+            with open(log_path, 'w') as f:
+                os.fsync(f.fileno())
+        if fresh:
+            self.file_signatures[s_class] = self._file_signature(cls)
+
+    def _write_snapshot(self, cls, sync: bool = False):
+        """ Write the objects in memory over the snapshot file
+
+        With sync, the file and then its directory are synced so the
+        new snapshot is durable before the caller truncates the log.
+        """
+        file_path = ".db_{}.json".format(cls.__name__)
+        objs = self.objects(cls)
+        if isinstance(objs, LazyObjects):
+            objs_json = objs.to_json()
+        else:
+            objs_json = {}
+            for obj_id, obj in objs.items():
+                objs_json[obj_id] = obj.to_json(True)
+
+        tmp_path = "{}.tmp".format(file_path)
+        with open(tmp_path, 'w') as f:
+            json.dump(objs_json, f)
+            if sync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
+        if sync:
+            dir_fd = os.open(path.dirname(path.abspath(file_path)),
+                             os.O_RDONLY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+
+    def _compact(self, cls):
+        """ Fold the log into the snapshot and truncate it
+
+        Under an exclusive flock on the log, the snapshot and the log
+        (including the entries other workers appended) are loaded, the
+        result is written as the new snapshot and synced with its
+        directory, and only then is the log truncated.
+        """
+        s_class = cls.__name__
+        log_path = ".db_{}.log".format(s_class)
+        with open(log_path, 'ab') as log:
+            fcntl.flock(log.fileno(), fcntl.LOCK_EX)
+            try:
+                self.load(cls)
+                self._write_snapshot(cls, sync=True)
+                os.ftruncate(log.fileno(), 0)
+                os.fsync(log.fileno())
+                self.file_signatures[s_class] = self._file_signature(cls)
+            finally:
+                fcntl.flock(log.fileno(), fcntl.LOCK_UN)
+
+    def _append_to_log(self, cls, entry: dict):
+        """ Append one mutation to the log file
+
+        If the log does not end with a newline (a write torn by a
+        crash), the entry starts on a new line so that only the torn
+        line is skipped by load(). The log is compacted into the
+        snapshot once it grows past `compact_threshold` bytes.
+
+        The recorded file signature is only brought up to date when the
+        log holds nothing but this entry on top of what was loaded, so a
+        concurrent write by another worker is still seen as a change.
+        """
+        s_class = cls.__name__
+        log_path = ".db_{}.log".format(s_class)
+        signature = self.file_signatures.get(s_class)
+        fresh = signature == self._file_signature(cls)
+        line = json.dumps(entry).encode() + b"\n"
+        with open(log_path, 'ab+') as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_SH)
+            try:
+                start = f.seek(0, os.SEEK_END)
+                if start > 0:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        line = b"\n" + line
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+                size = f.tell()
+                if fresh:
+                    new_signature = self._file_signature(cls)
+                    # Only our line was added if the log grew by exactly
+                    # its length from the size we had loaded; otherwise
+                    # another worker wrote too and a reload is due
+                    old_log, new_log = signature[1], new_signature[1]
+                    if (new_signature[0] == signature[0]
+                            and start == (old_log[1] if old_log else 0)
+                            and new_log is not None
+                            and new_log[1] == size == start + len(line)
+                            and (old_log is None
+                                 or old_log[0] == new_log[0])):
+                        self.file_signatures[s_class] = new_signature
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        if size > self.compact_threshold:
+            self.persist(cls)
+
+    def save(self, obj):
+        """ Save one object
+        """
+        objs = self.objects(obj.__class__)
+        if obj.id not in objs:
+            self.sorted_ids.pop(obj.__class__.__name__, None)
+        objs[obj.id] = obj
+        self._index(obj)
+        if self.append_log:
+            self._append_to_log(
+                obj.__class__, {"op": "save", "obj": obj.to_json(True)})
+        else:
+            self.persist(obj.__class__)
+
+    def remove(self, obj):
+        """ Remove one object
+        """
+        objs = self.objects(obj.__class__)
+        if objs.get(obj.id) is not None:
+            del objs[obj.id]
+            self.sorted_ids.pop(obj.__class__.__name__, None)
+            self._unindex(obj)
+            if self.append_log:
+                self._append_to_log(
+                    obj.__class__, {"op": "remove", "id": obj.id})
+            else:
+                self.persist(obj.__class__)
+
+    def count(self, cls) -> int:
+        """ Count all objects of a class
+        """
+        return len(self.objects(cls).keys())
+
+    def get(self, cls, id: str) -> TypeVar('Base'):
+        """ Return one object by ID
+        """
+        return self.objects(cls).get(id)
+
+    def search(self, cls, attributes: dict = {}) -> List[TypeVar('Base')]:
+        """ Search all objects with matching attributes
+        """
+        s_class = cls.__name__
+        all_objs = self.objects(cls)
+        objs = all_objs.values()
+        for k, v in attributes.items():
+            index = self.indexes.get(s_class, {}).get(k)
+            if index is None:
+                continue
+            try:
+                ids = index.get(v, {})
+            except TypeError:
+                continue
+            objs = [all_objs[obj_id] for obj_id in ids]
+            break
+
+        return [obj for obj in objs if _matches(obj, attributes)]
+
+    def page(self, cls, after: str = None,
+             limit: int = 100) -> List[TypeVar('Base')]:
+        """ Return up to limit objects ordered by ID, with IDs after after
+
+        The sorted IDs are cached until an object is added or removed,
+        and lazily loaded objects outside the page are not built.
+        """
+        objs = self.objects(cls)
+        ids = self.sorted_ids.get(cls.__name__)
+        if ids is None:
+            ids = self.sorted_ids[cls.__name__] = sorted(objs)
+        start = 0 if after is None else bisect.bisect_right(ids, after)
+        return [objs[obj_id] for obj_id in ids[start:start + limit]]
+
+
+class SQLiteStorage(Storage):
+    """ Storage in a SQLite database
+
+    Each class gets a table `(id, data, <indexed attributes>)` where
+    `data` is the JSON serialization of the object and every attribute
+    of `indexed_attributes` is a column with its own index. Equality
+    searches on those attributes run in SQL; other attributes are
+    matched on the returned objects. The sqlite3 module caches the
+    prepared statements of each per-thread connection.
+    """
+
+    def __init__(self, file_path: str):
+        """ Initialize the storage on a database file
+        """
+        self.file_path = file_path
+        self.tables = set()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _db(self) -> sqlite3.Connection:
+        """ Return the connection of the current thread
+        """
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.file_path, timeout=30,
+                                 isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def _table(self, cls) -> str:
+        """ Return the table of a class, creating it if needed
+        """
+        s_class = cls.__name__
+        if s_class in self.tables:
+            return s_class
+        with self._lock:
+            db = self._db()
+            db.execute(
+                'CREATE TABLE IF NOT EXISTS "{}" ('
+                'id TEXT PRIMARY KEY, data TEXT NOT NULL)'.format(s_class))
+            columns = {row[1] for row in db.execute(
+                'PRAGMA table_info("{}")'.format(s_class))}
+            for attr in cls.indexed_attributes:
+                if attr not in columns:
+                    db.execute('ALTER TABLE "{}" ADD COLUMN "{}"'.format(
+                        s_class, attr))
+                db.execute(
+                    'CREATE INDEX IF NOT EXISTS "{0}_{1}" '
+                    'ON "{0}" ("{1}")'.format(s_class, attr))
+            self.tables.add(s_class)
+        return s_class
+
+    def load(self, cls):
+        """ Nothing to load: objects are read from the database
+        """
+        self._table(cls)
+
+    def load_if_changed(self, cls, max_age: float = 0) -> bool:
+        """ Nothing to reload: objects are read from the database
+        """
+        self._table(cls)
+        return False
+
+    def persist(self, cls):
+        """ Nothing to write: every save() is already persisted
+        """
+        self._table(cls)
+
+    def save(self, obj):
+        """ Save one object
+        """
+        cls = obj.__class__
+        table = self._table(cls)
+        attrs = cls.indexed_attributes
+        columns = "".join(', "{}"'.format(attr) for attr in attrs)
+        updates = "".join(
+            ', "{0}" = excluded."{0}"'.format(attr) for attr in attrs)
+        self._db().execute(
+            'INSERT INTO "{}" (id, data{}) VALUES (?, ?{}) '
+            'ON CONFLICT(id) DO UPDATE SET data = excluded.data{}'.format(
+                table, columns, ", ?" * len(attrs), updates),
+            [obj.id, json.dumps(obj.to_json(True))]
+            + [getattr(obj, attr, None) for attr in attrs])
+
+    def remove(self, obj):
+        """ Remove one object
+        """
+        self._db().execute(
+            'DELETE FROM "{}" WHERE id = ?'.format(
+                self._table(obj.__class__)), (obj.id,))
+
+    def count(self, cls) -> int:
+        """ Count all objects of a class
+        """
+        return self._db().execute(
+            'SELECT COUNT(*) FROM "{}"'.format(self._table(cls))
+        ).fetchone()[0]
+
+    def get(self, cls, id: str) -> TypeVar('Base'):
+        """ Return one object by ID
+        """
+        row = self._db().execute(
+            'SELECT data FROM "{}" WHERE id = ?'.format(self._table(cls)),
+            (id,)).fetchone()
+        return cls(**json.loads(row[0])) if row else None
+
+    def search(self, cls, attributes: dict = {}) -> List[TypeVar('Base')]:
+        """ Search all objects with matching attributes
+        """
+        table = self._table(cls)
+        clauses = []
+        params = []
+        for k, v in attributes.items():
+            if k in cls.indexed_attributes and \
+                    isinstance(v, (str, int, float, type(None))):
+                clauses.append('"{}" IS ?'.format(k))
+                params.append(v)
+        where = " WHERE " + " AND ".join(clauses) if clauses else ""
+        rows = self._db().execute(
+            'SELECT data FROM "{}"{} ORDER BY rowid'.format(table, where),
+            params)
+        objs = (cls(**json.loads(row[0])) for row in rows)
+        return [obj for obj in objs if _matches(obj, attributes)]
+
+    def page(self, cls, after: str = None,
+             limit: int = 100) -> List[TypeVar('Base')]:
+        """ Return up to limit objects ordered by ID, with IDs after after
+        """
+        rows = self._db().execute(
+            'SELECT data FROM "{}" WHERE id > ? ORDER BY id LIMIT ?'.format(
+                self._table(cls)),
+            ("" if after is None else after, limit))
+        return [cls(**json.loads(row[0])) for row in rows]
+
+
+def create_storage() -> Storage:
+    """ Create the storage engine selected by the environment
+
+    MODELS_STORAGE picks the engine ("file" by default, or "sqlite"
+    with its database at MODELS_SQLITE_PATH). MODELS_APPEND_LOG=1 and
+    MODELS_COMPACT_THRESHOLD configure the append log of FileStorage,
+    MODELS_LAZY_LOAD=1 its lazy loading.
+    """
+    if getenv("MODELS_STORAGE", "file") == "sqlite":
+        return SQLiteStorage(getenv("MODELS_SQLITE_PATH", ".db.sqlite"))
+    return FileStorage(
+        getenv("MODELS_APPEND_LOG", "0") == "1",
+        int(getenv("MODELS_COMPACT_THRESHOLD", 1024 * 1024)),
+        getenv("MODELS_LAZY_LOAD", "0") == "1")
@@ -3,12 +3,15 @@
 """
 import hashlib
 from models.base import Base
+from models.metrics import timed
 
 
 class User(Base):
     """ User class
     """
 
+    indexed_attributes = ("email",)
+
     def __init__(self, *args: list, **kwargs: dict):
         """ Initialize a User instance
         """
@@ -33,6 +36,7 @@ class User(Base):
         else:
             self._password = hashlib.sha256(pwd.encode()).hexdigest().lower()
 
+    @timed("user.is_valid_password")
     def is_valid_password(self, pwd: str) -> bool:
         """ Validate a password
         """
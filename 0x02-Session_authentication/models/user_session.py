@@ -9,6 +9,8 @@ from models.base import Base
 class UserSession(Base):
     """A class used to represent a UserSession."""
 
+    indexed_attributes = ("session_id",)
+
     def __init__(self, *args: list, **kwargs: dict):
         """Initializes the UserSession with the user ID and session ID."""
         super().__init__(*args, **kwargs)
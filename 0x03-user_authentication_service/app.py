@@ -10,6 +10,14 @@ app = Flask(__name__)
 app.url_map.strict_slashes = False
 
 
+@app.teardown_appcontext
+def remove_db_session(exception=None):
+    """
+    Releases the database session of the request's thread.
+    """
+    AUTH._db.remove_session()
+
+
 @app.route("/", methods=["GET"])
 def index():
     """
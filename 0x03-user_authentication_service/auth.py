@@ -1,21 +1,69 @@
 #!/usr/bin/env python3
 """Module contains the logic for user authentication"""
 
-from typing import Union
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Iterable, List, Optional, Tuple, Union
+import math
+import os
+import statistics
+import time
 import uuid
 
 import bcrypt
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm.exc import NoResultFound
 
 from db import DB
 from user import User
 
 
-def _hash_password(password: str) -> bytes:
+DEFAULT_ROUNDS = 12
+
+
+def _hash_password(password: str, rounds: int = DEFAULT_ROUNDS) -> bytes:
     """
     Hashes a password using bcrypt and returns the hashed password.
     """
-    return bcrypt.hashpw(password.encode(), bcrypt.gensalt())
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds))
+
+
+def _get_rounds(hashed_password: Union[bytes, str]) -> int:
+    """
+    Returns the bcrypt cost factor a hashed password was created with.
+    """
+    if isinstance(hashed_password, str):
+        hashed_password = hashed_password.encode()
+    return int(hashed_password.split(b"$")[2])
+
+
+def _calibrate_rounds(target_ms: float, samples: int = 5,
+                      probe_rounds: int = 8) -> int:
+    """
+    Measures this host and returns the bcrypt cost factor whose median
+    verification time is closest to target_ms.
+    """
+    hashed_pwd = _hash_password("calibration", probe_rounds)
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        bcrypt.checkpw(b"calibration", hashed_pwd)
+        timings.append((time.perf_counter() - start) * 1000)
+    rounds = probe_rounds + round(
+        math.log2(target_ms / statistics.median(timings)))
+    return max(4, min(31, rounds))
+
+
+def _configured_rounds() -> int:
+    """
+    Returns the bcrypt cost factor from BCRYPT_ROUNDS, or calibrated for
+    the BCRYPT_TARGET_MS verification latency, or the bcrypt default.
+    """
+    if os.getenv("BCRYPT_ROUNDS"):
+        return int(os.getenv("BCRYPT_ROUNDS"))
+    if os.getenv("BCRYPT_TARGET_MS"):
+        return _calibrate_rounds(float(os.getenv("BCRYPT_TARGET_MS")))
+    return DEFAULT_ROUNDS
 
 
 def _generate_uuid() -> str:
@@ -32,11 +80,13 @@ class Auth:
     user sessions.
     """
 
-    def __init__(self):
+    def __init__(self, rounds: int = None):
         """
         Initializes a new Auth instance, which includes a new DB instance.
+        The bcrypt cost factor defaults to _configured_rounds().
         """
         self._db = DB()
+        self._rounds = rounds or _configured_rounds()
 
     def register_user(self, email: str, password: str) -> User:
         """
@@ -46,16 +96,73 @@ class Auth:
         try:
             self._db.find_user_by(email=email)
         except NoResultFound:
-            hashed_pwd = _hash_password(password)
-            return self._db.add_user(email, hashed_pwd)
+            hashed_pwd = _hash_password(password, self._rounds)
+            try:
+                return self._db.add_user(email, hashed_pwd)
+            except IntegrityError:
+                # Registered concurrently since the lookup above
+                pass
 
         raise ValueError(f"User {email} already exists")
 
+    def register_users(self, users: Iterable[Tuple[str, str]],
+                       batch_size: int = 1000,
+                       workers: int = None) -> List[Optional[str]]:
+        """
+        Registers many users from (email, password) pairs.
+        Emails are checked against the database with batched IN queries,
+        passwords are hashed in parallel by workers threads (bcrypt releases
+        the GIL), and users are inserted batch_size per transaction.
+        Returns one entry per pair: None if the user was registered, else
+        the reason it was not. A malformed entry only fails on its own.
+        """
+        users = list(users)
+        errors = [None] * len(users)
+        pairs = []
+        for i, user in enumerate(users):
+            try:
+                email, password = user
+            except (TypeError, ValueError):
+                errors[i] = "invalid entry, expected (email, password)"
+                email = password = None
+            pairs.append((email, password))
+        existing = self._db.find_existing_emails(
+            {email for email, _ in pairs if isinstance(email, str)})
+        seen = set()
+        todo = []
+        for i, (email, password) in enumerate(pairs):
+            if errors[i] is not None:
+                continue
+            if not isinstance(email, str) or not email:
+                errors[i] = "email missing"
+            elif not isinstance(password, str) or not password:
+                errors[i] = "password missing"
+            elif email in existing or email in seen:
+                errors[i] = f"User {email} already exists"
+            else:
+                seen.add(email)
+                todo.append(i)
+
+        hash_password = partial(_hash_password, rounds=self._rounds)
+        with ThreadPoolExecutor(workers) as executor:
+            for start in range(0, len(todo), batch_size):
+                batch = todo[start:start + batch_size]
+                hashed_pwds = executor.map(
+                    hash_password, (pairs[i][1] for i in batch))
+                results = self._db.add_users_bulk(
+                    [{"email": pairs[i][0], "hashed_password": hashed_pwd}
+                     for i, hashed_pwd in zip(batch, hashed_pwds)],
+                    batch_size)
+                for i, error in zip(batch, results):
+                    errors[i] = error
+        return errors
+
     def valid_login(self, email: str, password: str) -> bool:
         """
         Validates the login credentials of a user.
         If the user does not exist or the password is incorrect,
-        False is returned.
+        False is returned. A valid password stored with another cost
+        factor is rehashed with the current one.
         """
         try:
             user = self._db.find_user_by(email=email)
@@ -66,7 +173,16 @@ class Auth:
         # if isinstance(hashed_pwd, str):
         #     hashed_pwd = hashed_pwd.encode()
 
-        return bcrypt.checkpw(password.encode(), hashed_pwd)
+        if not bcrypt.checkpw(password.encode(), hashed_pwd):
+            return False
+
+        if _get_rounds(hashed_pwd) != self._rounds:
+            self._db.update_user(
+                user.id,
+                hashed_password=_hash_password(password, self._rounds)
+            )
+
+        return True
 
     def create_session(self, email: str) -> Union[str, None]:
         """
@@ -135,7 +251,7 @@ class Auth:
         except NoResultFound:
             raise ValueError
 
-        hashed_pwd = _hash_password(password)
+        hashed_pwd = _hash_password(password, self._rounds)
 
         self._db.update_user(
             user.id,
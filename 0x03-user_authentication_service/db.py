@@ -4,42 +4,138 @@
 This module provides the DB class for interacting with a SQLite database.
 """
 
-from sqlalchemy import create_engine
-from sqlalchemy.exc import InvalidRequestError
+import os
+from typing import Iterable, List, Optional, Set
+
+from sqlalchemy import (create_engine, event, insert, inspect, select, text,
+                        update)
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import IntegrityError, InvalidRequestError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlalchemy.orm.exc import NoResultFound
 from sqlalchemy.orm.session import Session
+from sqlalchemy.orm.util import identity_key
+from sqlalchemy.schema import CreateColumn
 
 from user import Base, User
 
 
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """
+    Configures every new SQLite connection: WAL journaling so readers do not
+    block the writer, and a busy timeout so concurrent writers wait for the
+    lock instead of failing.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.close()
+
+
+def _create_engine(url: str) -> Engine:
+    """
+    Creates the engine for the given database URL. The connection pool is
+    sized by DB_POOL_SIZE and DB_MAX_OVERFLOW. File-based SQLite databases
+    get connections shareable across threads and WAL mode.
+    """
+    kwargs = {}
+    database = make_url(url)
+    if database.get_backend_name() == "sqlite":
+        kwargs["connect_args"] = {"check_same_thread": False}
+    if database.get_backend_name() != "sqlite" or \
+            database.database not in (None, "", ":memory:"):
+        kwargs["pool_size"] = int(os.getenv("DB_POOL_SIZE", 5))
+        kwargs["max_overflow"] = int(os.getenv("DB_MAX_OVERFLOW", 10))
+    engine = create_engine(url, **kwargs)
+    if database.get_backend_name() == "sqlite":
+        event.listen(engine, "connect", _set_sqlite_pragmas)
+    return engine
+
+
 class DB:
     """
     The DB class encapsulates a SQLite database connection and provides methods
     for interacting with User records.
+
+    Each thread gets its own session from a scoped_session registry; callers
+    serving requests should call remove_session() when a request ends.
     """
 
-    def __init__(self) -> None:
+    def __init__(self, url: str = None, reset: bool = None) -> None:
         """
-        Initializes a new DB instance. This involves setting up the engine,
-        dropping all existing tables, and creating new tables.
+        Initializes a new DB instance. This involves setting up the engine
+        for url (DB_URL, or sqlite:///a.db by default) and bringing the
+        existing schema up to date without touching its data.
+
+        With reset (or DB_RESET=1), all existing tables are dropped and
+        created again instead; this wipes the data and is meant for tests.
+        """
+        self._engine = _create_engine(
+            url or os.getenv("DB_URL", "sqlite:///a.db"))
+        if reset is None:
+            reset = os.getenv("DB_RESET", "0") == "1"
+        if reset:
+            Base.metadata.drop_all(self._engine)
+            Base.metadata.create_all(self._engine)
+        else:
+            self._migrate()
+        self.__session = scoped_session(
+            sessionmaker(bind=self._engine, expire_on_commit=False))
+
+    def _migrate(self) -> None:
+        """
+        Applies idempotent migrations: creates the missing tables, then adds
+        the columns and indexes missing from the existing ones. Only the
+        schema is inspected, so startup does not depend on the number of
+        rows.
+
+        A missing NOT NULL column needs a server_default to fill the rows
+        already there; without one a ValueError is raised before anything
+        is altered.
         """
-        self._engine = create_engine("sqlite:///a.db")
-        Base.metadata.drop_all(self._engine)
         Base.metadata.create_all(self._engine)
-        self.__session = None
+        inspector = inspect(self._engine)
+        preparer = self._engine.dialect.identifier_preparer
+        missing = []
+        for table in Base.metadata.sorted_tables:
+            columns = {
+                column["name"] for column in inspector.get_columns(table.name)
+            }
+            for column in table.columns:
+                if column.name in columns:
+                    continue
+                if not column.nullable and column.server_default is None:
+                    raise ValueError(
+                        "Cannot add NOT NULL column {}.{} to existing rows "
+                        "without a server_default".format(
+                            table.name, column.name))
+                missing.append((table, column))
+        with self._engine.begin() as connection:
+            for table, column in missing:
+                connection.execute(text("ALTER TABLE {} ADD COLUMN {}".format(
+                    preparer.format_table(table),
+                    CreateColumn(column).compile(dialect=self._engine.dialect)
+                )))
+            for table in Base.metadata.sorted_tables:
+                for index in table.indexes:
+                    index.create(connection, checkfirst=True)
 
     @property
     def _session(self) -> Session:
         """
-        Returns a memoized session object. If no session exists, a new one is
-        created and returned.
+        Returns the session of the current thread, created on first use.
+        """
+        return self.__session()
+
+    def remove_session(self) -> None:
+        """
+        Closes the session of the current thread and returns its connection
+        to the pool.
         """
-        if self.__session is None:
-            DBSession = sessionmaker(bind=self._engine)
-            self.__session = DBSession()
-        return self.__session
+        self.__session.remove()
 
     def add_user(self, email: str, hashed_password: str) -> User:
         """
@@ -48,10 +144,64 @@ class DB:
         """
         user = User(email=email, hashed_password=hashed_password)
         self._session.add(user)
-        self._session.commit()
+        try:
+            self._session.commit()
+        except Exception:
+            self._session.rollback()
+            raise
 
         return user
 
+    def find_existing_emails(self, emails: Iterable[str],
+                             chunk_size: int = 500) -> Set[str]:
+        """
+        Returns the given emails that already belong to a User, looked up with
+        one IN query per chunk_size emails.
+        """
+        emails = list(emails)
+        existing = set()
+        for i in range(0, len(emails), chunk_size):
+            existing.update(self._session.scalars(
+                select(User.email).where(
+                    User.email.in_(emails[i:i + chunk_size]))))
+        return existing
+
+    def add_users_bulk(self, users: Iterable[dict],
+                       batch_size: int = 1000) -> List[Optional[str]]:
+        """
+        Inserts User records from dicts of column values, batch_size records
+        per transaction, each batch as a single executemany INSERT. Returns
+        one entry per record: None if it was inserted, else the error. When a
+        batch fails, its records are retried one by one so only the faulty
+        ones are reported: "User <email> already exists" for an email that
+        is already taken, the driver's message for any other error.
+        """
+        users = list(users)
+        errors = []
+        for i in range(0, len(users), batch_size):
+            batch = users[i:i + batch_size]
+            try:
+                self._session.execute(insert(User), batch)
+                self._session.commit()
+                errors.extend([None] * len(batch))
+                continue
+            except Exception:
+                self._session.rollback()
+            for user in batch:
+                try:
+                    self._session.execute(insert(User), [user])
+                    self._session.commit()
+                    errors.append(None)
+                except Exception as e:
+                    self._session.rollback()
+                    email = user.get("email")
+                    if (isinstance(e, IntegrityError) and
+                            self.find_existing_emails([email])):
+                        errors.append(f"User {email} already exists")
+                    else:
+                        errors.append(str(getattr(e, "orig", e)))
+        return errors
+
     def _validate_attributes(self, kwargs: dict) -> None:
         """
         Validates the given attributes against the User table columns. If any
@@ -87,11 +237,28 @@ class DB:
         Updates a User record with the given user_id and attributes. If the
         User is not found or the attributes are invalid, an exception is
         raised.
+
+        The record is updated by a single UPDATE statement (whose compiled
+        form SQLAlchemy caches) without loading it first; a User already
+        loaded in the current session is updated in place.
         """
-        user = self.find_user_by(id=user_id)
         self._validate_attributes(kwargs)
+        if not kwargs:
+            self.find_user_by(id=user_id)
+            return
 
-        for key, value in kwargs.items():
-            setattr(user, key, value)
+        try:
+            result = self._session.execute(
+                update(User).where(User.id == user_id).values(**kwargs),
+                execution_options={"synchronize_session": False})
+            if result.rowcount == 0:
+                raise NoResultFound
+            self._session.commit()
+        except Exception:
+            self._session.rollback()
+            raise
 
-        self._session.commit()
+        user = self._session.identity_map.get(identity_key(User, user_id))
+        if user is not None:
+            for key, value in kwargs.items():
+                set_committed_value(user, key, value)
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Main file: compares importing users one register_user call at a time
+with Auth.register_users, and projects the time of a 100k-user import
+
+Usage: ./main_import.py [users] [rounds]   (default: 2000 4)
+"""
+import os
+import sys
+import tempfile
+import time
+
+USERS = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+ROUNDS = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+TARGET = 100000
+
+with tempfile.TemporaryDirectory() as tmp:
+    os.environ["DB_URL"] = "sqlite:///{}".format(os.path.join(tmp, "a.db"))
+
+    from auth import Auth
+
+    auth = Auth(rounds=ROUNDS)
+    single = max(1, USERS // 10)
+    start = time.perf_counter()
+    for i in range(single):
+        auth.register_user("single{}@example.com".format(i), "pwd")
+    auth._db.remove_session()
+    one_by_one = single / (time.perf_counter() - start)
+
+    users = [("bulk{}@example.com".format(i), "pwd{}".format(i))
+             for i in range(USERS)]
+    start = time.perf_counter()
+    errors = auth.register_users(users)
+    bulk = USERS / (time.perf_counter() - start)
+    assert errors == [None] * USERS
+    assert auth.valid_login(*users[-1])
+    auth._db.remove_session()
+    auth._db._engine.dispose()
+
+    print("cost {}: register_user {:.0f} users/s, register_users {:.0f} "
+          "users/s ({:.1f}x)".format(ROUNDS, one_by_one, bulk,
+                                     bulk / one_by_one))
+    print("{} users: {:.1f} min one by one, {:.1f} min in bulk".format(
+        TARGET, TARGET / one_by_one / 60, TARGET / bulk / 60))
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Main file: checks the query plans of the users lookups and times them
+with and without the indexes
+
+Usage: ./main_indexes.py [users ...]   (default: 10000 100000)
+"""
+import os
+import sys
+import tempfile
+import time
+
+from db import DB
+from user import User
+
+COLUMNS = ("email", "session_id", "reset_token")
+LOOKUPS = 200
+BATCH = 10000
+
+
+def per_lookup(db, column, count, lookups):
+    """Returns the mean time of find_user_by on column, on a fresh session"""
+    db.remove_session()
+    values = ["{}{}".format(column, i)
+              for i in range(0, count, count // lookups)]
+    start = time.perf_counter()
+    for value in values:
+        db.find_user_by(**{column: value})
+    seconds = (time.perf_counter() - start) / len(values)
+    db.remove_session()
+    return seconds
+
+
+def plan(db, column):
+    """Returns the EXPLAIN QUERY PLAN details of a lookup on column"""
+    with db._engine.connect() as connection:
+        return " ".join(row[-1] for row in connection.exec_driver_sql(
+            "EXPLAIN QUERY PLAN SELECT * FROM users WHERE {} = ?".format(
+                column), ("x",)))
+
+
+with tempfile.TemporaryDirectory() as tmp:
+    for count in map(int, sys.argv[1:] or (10000, 100000)):
+        url = "sqlite:///{}".format(os.path.join(tmp, "{}.db".format(count)))
+        db = DB(url, reset=True)
+        for start in range(0, count, BATCH):
+            assert not any(db.add_users_bulk(
+                dict({column: "{}{}".format(column, i) for column in COLUMNS},
+                     hashed_password=b"hashed")
+                for i in range(start, min(start + BATCH, count))))
+
+        timings = {}
+        for column in COLUMNS:
+            details = plan(db, column)
+            assert "USING INDEX" in details and "SCAN" not in details, details
+            print("{:>8} users, {:<11}: {}".format(count, column, details))
+            timings[column] = per_lookup(
+                db, column, count, min(LOOKUPS, count))
+
+        for index in User.__table__.indexes:
+            index.drop(db._engine)
+        # Pooled connections may keep statements prepared with the indexes
+        db._engine.dispose()
+        for column in COLUMNS:
+            assert "SCAN" in plan(db, column)
+            scan = per_lookup(db, column, count, min(LOOKUPS, count) // 10)
+            print("{:>8} users, {:<11}: scan {:.1f}us, index {:.1f}us "
+                  "({:.0f}x)".format(count, column, scan * 1e6,
+                                     timings[column] * 1e6,
+                                     scan / timings[column]))
+        db.remove_session()
+        db._engine.dispose()
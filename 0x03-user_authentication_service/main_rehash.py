@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Main file: checks that logging in upgrades the bcrypt cost factor
+"""
+import os
+import tempfile
+
+with tempfile.TemporaryDirectory() as tmp:
+    os.environ["DB_URL"] = "sqlite:///{}".format(os.path.join(tmp, "a.db"))
+
+    from auth import Auth, _get_rounds
+
+    email = "bob@bob.com"
+    password = "MyPwdOfBob"
+
+    Auth(rounds=4).register_user(email, password)
+    auth = Auth(rounds=5)
+    hashed_password = auth._db.find_user_by(email=email).hashed_password
+    assert _get_rounds(hashed_password) == 4
+
+    # A wrong password is rejected and leaves the hash untouched
+    assert not auth.valid_login(email, "WrongPwd")
+    auth._db.remove_session()
+    user = auth._db.find_user_by(email=email)
+    assert user.hashed_password == hashed_password
+
+    # The right password is accepted and rehashed with the new cost
+    assert auth.valid_login(email, password)
+    auth._db.remove_session()
+    user = auth._db.find_user_by(email=email)
+    assert _get_rounds(user.hashed_password) == 5
+    assert auth.valid_login(email, password)
+
+    # Once upgraded, logging in again does not rehash
+    auth._db.remove_session()
+    assert auth._db.find_user_by(email=email).hashed_password == \
+        user.hashed_password
+    print("OK")
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Main file: times DB startup on a database of existing users, migrating
+in place versus dropping and recreating the schema
+
+Usage: ./main_startup.py [users]   (default: 1000000)
+"""
+import os
+import sys
+import tempfile
+import time
+
+from db import DB
+
+USERS = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+BATCH = 10000
+
+with tempfile.TemporaryDirectory() as tmp:
+    url = "sqlite:///{}".format(os.path.join(tmp, "a.db"))
+    db = DB(url, reset=True)
+    for start in range(0, USERS, BATCH):
+        db.add_users_bulk(
+            {"email": "user{}@example.com".format(i),
+             "hashed_password": b"hashed"}
+            for i in range(start, min(start + BATCH, USERS)))
+    db.remove_session()
+    db._engine.dispose()
+
+    start = time.perf_counter()
+    db = DB(url)
+    migrate = time.perf_counter() - start
+    assert db.find_user_by(email="user{}@example.com".format(USERS - 1))
+    db.remove_session()
+    db._engine.dispose()
+
+    start = time.perf_counter()
+    db = DB(url, reset=True)
+    reset = time.perf_counter() - start
+    assert not db.find_existing_emails(["user0@example.com"])
+    db._engine.dispose()
+
+    print("{} users: migrate {:.3f}s (data kept), reset {:.3f}s "
+          "(data dropped)".format(USERS, migrate, reset))
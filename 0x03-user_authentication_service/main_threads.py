@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Main file: drives the app from several threads at once
+"""
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+THREADS = 16
+FLOWS = 160
+
+with tempfile.TemporaryDirectory() as tmp:
+    os.environ["DB_URL"] = "sqlite:///{}".format(os.path.join(tmp, "a.db"))
+    os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+    from app import AUTH, app
+
+    def flow(i: int) -> None:
+        """Registers, logs in, reads the profile and logs out a user"""
+        client = app.test_client()
+        email = "user{}@example.com".format(i)
+        password = "pwd{}".format(i)
+
+        response = client.post(
+            "/users", data={"email": email, "password": password})
+        assert response.status_code == 200, response.data
+        response = client.post(
+            "/sessions", data={"email": email, "password": password})
+        assert response.status_code == 200, response.data
+        session_id = client.get_cookie("session_id").value
+
+        for _ in range(3):
+            response = client.get("/profile")
+            assert response.status_code == 200, response.data
+            assert response.get_json() == {"email": email}
+
+        response = client.delete("/sessions")
+        assert response.status_code == 302, response.data
+        assert AUTH.get_user_from_session_id(session_id) is None
+        response = client.get("/profile")
+        assert response.status_code == 403, response.data
+
+    with ThreadPoolExecutor(THREADS) as executor:
+        list(executor.map(flow, range(FLOWS)))
+
+    AUTH._db.remove_session()
+    assert len(AUTH._db.find_existing_emails(
+        "user{}@example.com".format(i) for i in range(FLOWS))) == FLOWS
+    AUTH._db._engine.dispose()
+    print("{} flows on {} threads: OK".format(FLOWS, THREADS))
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Main file: compares the per-login cost of updating a user by loading it
+first with the single UPDATE of DB.update_user
+
+Usage: ./main_update.py [operations]   (default: 2000)
+"""
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+from db import DB
+
+OPERATIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+USERS = 10000
+
+
+def load_then_update(db, email, session_id):
+    """The login path as it was: load the user again, set, commit"""
+    user = db.find_user_by(email=email)
+    user = db.find_user_by(id=user.id)
+    user.session_id = session_id
+    db._session.commit()
+
+
+def single_update(db, email, session_id):
+    """The login path now: one UPDATE for the already loaded user"""
+    user = db.find_user_by(email=email)
+    db.update_user(user.id, session_id=session_id)
+
+
+with tempfile.TemporaryDirectory() as tmp:
+    db = DB("sqlite:///{}".format(os.path.join(tmp, "a.db")), reset=True)
+    db.add_users_bulk({"email": "user{}@example.com".format(i),
+                       "hashed_password": b"hashed"} for i in range(USERS))
+    db.remove_session()
+
+    for name, login in (("load then update", load_then_update),
+                        ("single UPDATE", single_update)):
+        session_ids = {}
+        start = time.perf_counter()
+        for i in range(OPERATIONS):
+            email = "user{}@example.com".format(i * 7 % USERS)
+            session_ids[email] = str(uuid.uuid4())
+            login(db, email, session_ids[email])
+            # Each login is its own request
+            db.remove_session()
+        seconds = time.perf_counter() - start
+        for email, session_id in session_ids.items():
+            assert db.find_user_by(email=email).session_id == session_id
+        db.remove_session()
+        print("{:<16}: {:.1f}us per login".format(
+            name, seconds / OPERATIONS * 1e6))
+    db._engine.dispose()
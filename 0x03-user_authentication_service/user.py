@@ -12,11 +12,13 @@ class User(Base):
     """
     The User class represents a table 'users' in a relational database.
     Each attribute of the User class represents a field in the table.
+    Emails are unique, and the columns users are looked up by (email,
+    session_id, reset_token) are indexed.
     """
 
     __tablename__ = "users"
     id = Column(Integer, primary_key=True)
-    email = Column(String(250), nullable=False)
+    email = Column(String(250), nullable=False, unique=True, index=True)
     hashed_password = Column(String(250), nullable=False)
-    session_id = Column(String(250))
-    reset_token = Column(String(250))
+    session_id = Column(String(250), index=True)
+    reset_token = Column(String(250), index=True)